@@ -1,9 +1,25 @@
 import os
-import json
+import collections
+import itertools
+import math
 import polars as pl
+import polars.selectors as cs
 import sys
-import xml.etree.ElementTree as ET
-from typing import Dict, Any, Union
+from concurrent.futures import Executor, ProcessPoolExecutor
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Any, Callable, Iterator, Optional, Tuple, Union
+
+# lxml builds the XML tree in C; its etree API is compatible with the stdlib one used here
+try:
+    from lxml import etree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+# orjson parses the large CAF payloads considerably faster; fall back to stdlib json
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
 
 def get_directory_path(state: str = None) -> str:
     """Get the appropriate directory path based on state parameter."""
@@ -11,126 +27,279 @@ def get_directory_path(state: str = None) -> str:
         return f"raw/caf_{state.lower()}"
     return "raw/caf"
 
-# Get state parameter from command line arguments
-state_param = sys.argv[1] if len(sys.argv) > 1 else None
-directory = get_directory_path(state_param)
+def recursive_find_json(directory: str) -> Iterator[str]:
+    """Recursively yields JSON files in the given directory."""
+    # scandir reuses the file type from the directory listing instead of a stat per entry
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from recursive_find_json(entry.path)
+            elif entry.name.endswith('.json'):
+                yield entry.path
+
+# posix_fadvise is only available on some platforms (not macOS or Windows)
+have_fadvise = hasattr(os, 'posix_fadvise')
+
+def prefetch_files(paths: Iterator[str]) -> Iterator[str]:
+    """Yield paths after asking the kernel to start reading them in the background.
+
+    Workers then find the contents in the page cache, so disk reads overlap with
+    parsing instead of each worker blocking on its own read. Paths are passed
+    through unchanged where posix_fadvise is unavailable.
+    """
+    if not have_fadvise:
+        yield from paths
+        return
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+        yield path
 
-print(f"Processing data from directory: {directory}")
+def map_bounded(executor: Executor, fn: Callable, iterable: Iterator, window: int) -> Iterator:
+    """Like executor.map, but with at most window calls submitted ahead of the results yielded.
 
-if not os.path.exists(directory):
-    print(f"Error: Directory {directory} does not exist. Please run initialize.sh and fetch.sh first.")
-    sys.exit(1)
+    Executor.map consumes the whole iterable before returning, which would walk
+    and prefetch the entire tree up front.
+    """
+    pending = collections.deque()
+    for item in iterable:
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(executor.submit(fn, item))
+    while pending:
+        yield pending.popleft().result()
 
-def recursive_find_json(directory: str) -> list[str]:
-    """Recursively finds JSON files in the given directory."""
-    return [os.path.join(root, file) for root, _, files in os.walk(directory) for file in files if file.endswith('.json')]
+# Direct child elements of the XML response -> output column
+xml_fields = {
+    'nameOfUserAgency': 'Organization Name',
+    'state': 'State', 
+    'proposalNo': 'Proposal Number',
+    'projectName': 'Project Name',
+    'category': 'Project Category (Code)',
+    'proposalStatus': 'Proposal Status',
+    'app_updated_on': 'Application Updated On'
+}
 
-def parse_xml_content(xml_string: str) -> Dict[str, Any]:
+def parse_xml_content(xml_content: Union[str, bytes]) -> Dict[str, Any]:
     """Parse XML content and extract fields."""
     try:
-        root = ET.fromstring(xml_string)
+        root = ET.fromstring(xml_content)
         result = {}
         
-        # Extract direct XML elements
-        xml_fields = {
-            'nameOfUserAgency': 'Organization Name',
-            'state': 'State', 
-            'proposalNo': 'Proposal Number',
-            'projectName': 'Project Name',
-            'category': 'Project Category (Code)',
-            'proposalStatus': 'Proposal Status',
-            'app_updated_on': 'Application Updated On'
-        }
-        
-        for xml_tag, field_name in xml_fields.items():
-            element = root.find(xml_tag)
-            if element is not None and element.text:
-                result[field_name] = element.text.strip()
+        # Extract direct XML elements in one pass over the children, using the
+        # first occurrence of each tag as find() would
+        seen_tags = set()
+        other_property = None
+        for child in root:
+            tag = child.tag
+            if tag in seen_tags:
+                continue
+            seen_tags.add(tag)
+            if tag == 'other_property':
+                other_property = child
+            elif tag in xml_fields and child.text:
+                result[xml_fields[tag]] = child.text.strip()
         
         # Parse other_property JSON if present
-        other_property = root.find('other_property')
         if other_property is not None and other_property.text:
             try:
-                properties = json.loads(other_property.text)
+                properties = _json.loads(other_property.text)
                 for prop in properties:
                     if prop.get('label') == 'Activity':
                         result['Project Category'] = prop.get('value', '')
                     elif prop.get('label') == 'Sector':
                         result['Sector'] = prop.get('value', '')
-            except json.JSONDecodeError:
+            except _json.JSONDecodeError:
                 pass
         
         return result
     except ET.ParseError:
         return {}
 
-def parse_json(file_path: str) -> Dict[str, Any]:
-    """Parses a JSON file and extracts specified keys."""
+# Fields that take only a handful of distinct values across all proposals
+low_cardinality_fields = (
+    'State',
+    'Project Category (Code)',
+    'Proposal Status',
+    'Organization Legal Status',
+    'Organization State',
+    'Applicant State',
+)
+
+def intern_low_cardinality(columns: Dict[str, list]) -> None:
+    """Intern repeated string values in per-column lists so records share a single copy of each.
+
+    Interned strings are unpickled as fresh copies, so this runs in the parent
+    process on each batch as it arrives rather than in the workers.
+    """
+    for field in low_cardinality_fields:
+        column = columns.get(field)
+        if column:
+            column[:] = [sys.intern(value) if isinstance(value, str) else value for value in column]
+
+def parse_json(file_path: str) -> Tuple[Dict[str, Any], Optional[str]]:
+    """Parses a JSON file and extracts specified keys.
+
+    Returns the extracted values and, if the file could not be processed, an
+    error message for the parent process to report.
+    """
     try:
-        with open(file_path, 'r') as f:
+        with open(file_path, 'rb') as f:
             content = f.read().strip()
         
         # Try to parse as JSON first
         try:
-            data = json.loads(content)
+            data = _json.loads(content)
             result = extract_values(data)
-        except json.JSONDecodeError:
+        except _json.JSONDecodeError:
             # If JSON parsing fails, try XML parsing
             result = parse_xml_content(content)
         
-        proposal_id = file_path.split('/')[-1].strip('.json')
-        result['proposal_url'] = f"https://parivesh.nic.in/newupgrade/#/report/ec?proposalId={proposal_id}"
+        # The proposal URL is built from this ID for all rows at once in main()
+        result['proposal_id'] = os.path.splitext(os.path.basename(file_path))[0]
         
-        return result
+        return result, None
     
     except Exception as e:
-        print(f"Error processing {file_path}: {str(e)}")
-    
-    return {}
+        return {}, f"Error processing {file_path}: {str(e)}"
 
-def safe_get(d: Union[Dict, list], *keys) -> Any:
-    """Safely navigate nested dictionaries and lists."""
-    for key in keys:
-        if isinstance(d, dict):
-            if key in d:
-                d = d[key]
-            else:
-                return None
-        elif isinstance(d, list):
-            if isinstance(key, int) and 0 <= key < len(d):
-                d = d[key]
-            else:
-                return None
+def batched(iterable: Iterator[str], size: int) -> Iterator[list]:
+    """Yield lists of up to size items from iterable."""
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+def add_record(columns: Dict[str, list], record_count: int, result: Dict[str, Any]) -> None:
+    """Append one record to per-column lists holding record_count records, padding missing fields with None."""
+    # New fields are added in the order they appear, so columns keep first-seen order
+    for field in result:
+        if field not in columns:
+            columns[field] = [None] * record_count
+    for field, column in columns.items():
+        column.append(result.get(field))
+
+def format_scalar(value: Any) -> Any:
+    """Format a non-string value as Polars does when it infers a string column row by row.
+
+    Floats are written positionally without a trailing .0 (0.0000002 rather than
+    2e-7, 1 rather than 1.0) and booleans in lowercase; strings and None pass through.
+    """
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float):
+        if math.isnan(value):
+            return 'NaN'
+        if math.isinf(value):
+            return 'inf' if value > 0 else '-inf'
+        # Keep the decimal places of the shortest repr, rounding the exact binary value half up
+        exponent = Decimal(repr(value)).normalize().as_tuple().exponent
+        if exponent < 0:
+            return format(Decimal(value).quantize(Decimal(1).scaleb(exponent), rounding=ROUND_HALF_UP), 'f')
+        return format(Decimal(repr(value)).normalize(), 'f')
+    return str(value)
+
+def column_schema(columns: Dict[str, list]) -> Dict[str, Optional[pl.DataType]]:
+    """Build the frame schema from the per-column lists.
+
+    Each column gets the type row-wise inference over per-record dicts gave it.
+    Columns holding any strings are Utf8, with their other values formatted in
+    place the same way; numeric and boolean columns take the widest type present.
+    Anything else (nested values) is left as None for Polars to infer.
+    """
+    schema = {}
+    for field, column in columns.items():
+        types = set(map(type, column)) - {type(None)}
+        if str in types:
+            if types != {str}:
+                column[:] = [format_scalar(value) for value in column]
+            schema[field] = pl.Utf8
+        elif not types:
+            schema[field] = pl.Null
+        elif float in types and types <= {bool, int, float}:
+            schema[field] = pl.Float64
+        elif int in types and types <= {bool, int}:
+            schema[field] = pl.Int64
+        elif types == {bool}:
+            schema[field] = pl.Boolean
         else:
+            schema[field] = None
+    return schema
+
+def parse_json_batch(file_paths: list) -> Tuple[Dict[str, list], int, list, int]:
+    """Parse a batch of files into per-column lists.
+
+    Returns the columns, the number of records in them, any error messages and
+    the number of files in the batch.
+    Sending one dict of lists back to the parent pickles far less than a dict
+    per record.
+    """
+    columns = {}
+    record_count = 0
+    errors = []
+    for file_path in file_paths:
+        result, error = parse_json(file_path)
+        if error:
+            errors.append(error)
+        if result:  # Only add non-empty results
+            add_record(columns, record_count, result)
+            record_count += 1
+    return columns, record_count, errors, len(file_paths)
+
+def safe_get(d: Any, keys: tuple) -> Any:
+    """Safely navigate nested dictionaries and lists along a tuple of keys."""
+    # Lookups almost always succeed, so subscripting inside try is cheaper than
+    # type-checking every level. Paths never end in a list index, so a string
+    # indexed by position cannot leak through as a value.
+    for key in keys:
+        try:
+            d = d[key]
+        except (KeyError, IndexError, TypeError):
             return None
     return d
 
-def extract_kml_urls(data: Dict[str, Any]) -> list[str]:
-    """Extract KML URLs from the data"""
+format_document_url = "https://parivesh.nic.in/dms/okm/downloadDocument?docTypemappingId={}&refId={}&refType={}&uuid={}&version={}".format
+
+def document_key(doc: Dict[str, Any]) -> Optional[tuple]:
+    """Return the identifiers that make up a document's DMS URL, if all are present
+
+    They are returned as strings, as they appear in the URL, so keys are equal
+    exactly when the URLs are (1, '1' and True would otherwise collide or differ).
+    """
+    get = doc.get
+    doc_id, ref_id, ref_type, uuid, version = get('document_mapping_id'), get('ref_id'), get('type'), get('uuid'), get('version')
+    if doc_id and ref_id and ref_type and uuid and version:
+        return (str(doc_id), str(ref_id), str(ref_type), str(uuid), str(version))
+    return None
+
+def document_url(doc: Dict[str, Any]) -> Optional[str]:
+    """Build the DMS download URL for a document, if all its identifiers are present"""
+    key = document_key(doc)
+    return format_document_url(*key) if key else None
+
+def extract_kml_urls(common_form_details: Any, clearence: Any) -> list[str]:
+    """Extract KML URLs from the commonFormDetails list and the clearence subtree"""
     kml_urls = []
-    seen_urls = set()  # To avoid duplicates
+    seen_keys = set()  # To avoid duplicates, checked before the URL is formatted
     
     def extract_kml_from_object(kml_obj: Dict[str, Any]) -> None:
         """Helper function to extract KML URL from a KML object"""
         if isinstance(kml_obj, dict) and 'document_name' in kml_obj:
             document_name = kml_obj['document_name']
             if document_name and document_name.endswith('.kml'):
-                # Extract required fields for the URL
-                doc_mapping_id = kml_obj.get('document_mapping_id')
-                ref_id = kml_obj.get('ref_id')
-                ref_type = kml_obj.get('type')
-                uuid = kml_obj.get('uuid')
-                version = kml_obj.get('version')
-                
-                # Construct the KML URL with the correct format
-                if all([doc_mapping_id, ref_id, ref_type, uuid, version]):
-                    kml_url = f"https://parivesh.nic.in/dms/okm/downloadDocument?docTypemappingId={doc_mapping_id}&refId={ref_id}&refType={ref_type}&uuid={uuid}&version={version}"
-                    if kml_url not in seen_urls:
-                        kml_urls.append(kml_url)
-                        seen_urls.add(kml_url)
+                key = document_key(kml_obj)
+                if key and key not in seen_keys:
+                    seen_keys.add(key)
+                    kml_urls.append(format_document_url(*key))
     
     # 1. Extract from cafKML array in commonFormDetails (all items)
-    common_form_details = safe_get(data, 'data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails')
     if common_form_details and isinstance(common_form_details, list):
         for form_detail in common_form_details:
             if isinstance(form_detail, dict):
@@ -141,7 +310,7 @@ def extract_kml_urls(data: Dict[str, Any]) -> list[str]:
                             extract_kml_from_object(caf_kml_item['caf_kml'])
     
     # 2. Extract from commonFormDetail (single item) in clearence
-    common_form_detail = safe_get(data, 'data', 'clearence', 'commonFormDetail')
+    common_form_detail = safe_get(clearence, ('commonFormDetail',))
     if isinstance(common_form_detail, dict):
         caf_kml_list = common_form_detail.get('cafKML')
         if caf_kml_list and isinstance(caf_kml_list, list):
@@ -150,14 +319,14 @@ def extract_kml_urls(data: Dict[str, Any]) -> list[str]:
                     extract_kml_from_object(caf_kml_item['caf_kml'])
     
     # 3. Extract from forestClearancePatchKmls
-    patch_kmls = safe_get(data, 'data', 'clearence', 'forestClearancePatchKmls')
+    patch_kmls = safe_get(clearence, ('forestClearancePatchKmls',))
     if patch_kmls and isinstance(patch_kmls, list):
         for patch_kml_item in patch_kmls:
             if isinstance(patch_kml_item, dict) and 'patch_kml' in patch_kml_item:
                 extract_kml_from_object(patch_kml_item['patch_kml'])
     
     # 4. Extract from forestClearanceProposedDiversions
-    proposed_diversions = safe_get(data, 'data', 'clearence', 'forestClearanceProposedDiversions')
+    proposed_diversions = safe_get(clearence, ('forestClearanceProposedDiversions',))
     if proposed_diversions and isinstance(proposed_diversions, list):
         for diversion in proposed_diversions:
             if isinstance(diversion, dict) and 'kml' in diversion:
@@ -165,148 +334,202 @@ def extract_kml_urls(data: Dict[str, Any]) -> list[str]:
     
     return kml_urls
 
+# Output column -> path of keys/indices into the CAF JSON
+fields_to_extract = {
+    'ID': ('data', 'proponentApplications', 'id'),
+    'Category': ('data', 'proponentApplications', 'applications', 'category'),
+    'Description': ('data', 'proponentApplications', 'applications', 'description'),
+
+
+    'Proposal Number': ('data', 'proponentApplications', 'proposal_no'),
+    'Application Date': ('data', 'proponentApplications', 'created_on'),
+    'Project Name': ('data', 'proponentApplications', 'projectDetailDto', 'projectName'),
+    'Project Description': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'project_description'),
+    'Total Cost (Lakhs)': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafProjectActivityCost', 'total_cost'),
+    'Employment (Construction)': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafProjectActivityCost', 'cp_total_employment'),
+    'Employment (Operational)': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafProjectActivityCost', 'op_existing_total_employment'),
+    'Project Land Requirement (Hectares)': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafLocationOfKml', 'existing_total_land'),
+    'Organization Name': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'organization_name'),
+    'Project Category (Code)': ('data', 'clearence', 'project_category'),
+    'Project Category': ('data', 'clearence', 'environmentClearanceProjectActivityDetails', 0, 'activities', 'name'),
+    
+    # Geographic information fields
+    
+    'Plot Number': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafKML', 0, 'cafKMLPlots', 0, 'plot_no'),
+    'Village': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafKML', 0, 'cafKMLPlots', 0, 'village'),
+    'Sub District': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafKML', 0, 'cafKMLPlots', 0, 'sub_District'),
+    'District': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafKML', 0, 'cafKMLPlots', 0, 'district'),
+    'State': ('data', 'proponentApplications', 'state'),
+    'Village Code': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafKML', 0, 'cafKMLPlots', 0, 'village_code'),
+    
+
+   'Proposal Type': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'proposal_for'),
+    'MoEFCC File': ('data', 'proponentApplications', 'moefccFileNumber'),
+    'State File': ('data', 'proponentApplications', 'stateFileNumber'),
+    'Plot Nos': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafKML', 0, 'cafKMLPlots', 0, 'plot_no'),
+    'Shape of Project': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafLocationOfKml', 'shape_of_project'),
+    'Existing Non-Forest Land': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafLocationOfKml', 'existing_non_forest_land'),
+    'Existing Forest Land': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafLocationOfKml', 'existing_forest_land'),
+    'Existing Total Land': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafLocationOfKml', 'existing_total_land'),
+    'Additional Non-Forest Land': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafLocationOfKml', 'additional_non_forest_land'),
+    'Additional Forest Land': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafLocationOfKml', 'additional_forest_land'),
+    'Additional Total Land': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafLocationOfKml', 'additional_total_land'),
+    'Existing Cost': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafProjectActivityCost', 'total_existing_cost'),
+    'Expansion Cost': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafProjectActivityCost', 'total_expension_cost'),
+    'Villages Affected': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafOthers', 'no_of_villages'),
+    'Project Displaced Families': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafOthers', 'no_of_project_displaced_families'),
+    'Project Affected Families': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafOthers', 'no_of_project_affected_families'),
+    'Alternative Site Examined': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafOthers', 'is_alternative_sites_examined'),
+    'Alternative Site Description': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafOthers', 'alternative_sites_description'),
+    'Government Restriction': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafOthers', 'is_any_govt_restriction'),
+    'Litigation Pending': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafOthers', 'is_any_litigation_pending'),
+    'Violation Involved': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafOthers', 'is_any_violayion_involved'),
+    'Last Visible Status': ('data', 'proponentApplications', 'last_visible_status'),
+    'Last Submission Date': ('data', 'proponentApplications', 'last_submission_date'),
+    'Grant Date': ('data', 'proponentApplications', 'grant_date'),
+    'Project Exemption Reason': ('data', 'clearence', 'project_exempted_reason'),
+    'EC Consultant': ('data', 'clearence', 'ecConsultant', 'consultant_name'),
+    
+    # Compensatory Afforestation fields
+    'Compensatory Afforestation Type': ('data', 'clearence', 'fcAforestationDetails', 'comp_afforestation_type'),
+    'Is Applicable Compensatory Afforestation': ('data', 'clearence', 'fcAforestationDetails', 'is_applicable_compensatory_afforestation'),
+    
+    # Mining Proposal fields
+    'Mining Date of Issue': ('data', 'clearence', 'forestClearanceMiningProposals', 'date_of_issue'),
+    'Mining Date of Validity': ('data', 'clearence', 'forestClearanceMiningProposals', 'date_of_validity'),
+    'Mining Lease Period': ('data', 'clearence', 'forestClearanceMiningProposals', 'lease_period'),
+    'Mining Date of Expiry': ('data', 'clearence', 'forestClearanceMiningProposals', 'date_of_expiry'),
+    'Mining Lease Area': ('data', 'clearence', 'forestClearanceMiningProposals', 'lease_area'),
+    'Mining Production Capacity': ('data', 'clearence', 'forestClearanceMiningProposals', 'production_capacity'),
+    'Mining Other Info': ('data', 'clearence', 'forestClearanceMiningProposals', 'other_info'),
+    'Mining Status of Approval': ('data', 'clearence', 'forestClearanceMiningProposals', 'status_of_approval'),
+    'Mining Approved Life of Mine': ('data', 'clearence', 'forestClearanceMiningProposals', 'approved_life_of_mine'),
+    'Mining Approving Authority Name': ('data', 'clearence', 'forestClearanceMiningProposals', 'approving_authority_name'),
+    'Mining Life of Mine Other Info': ('data', 'clearence', 'forestClearanceMiningProposals', 'life_of_mine_other_info'),
+    'Mining Type of Mining': ('data', 'clearence', 'forestClearanceMiningProposals', 'type_of_mining'),
+    'Mining Method of Mining': ('data', 'clearence', 'forestClearanceMiningProposals', 'method_of_mining'),
+    'Mining Type of Mining Other Info': ('data', 'clearence', 'forestClearanceMiningProposals', 'type_of_mining_other_info'),
+    'Mining Blasting Other Info': ('data', 'clearence', 'forestClearanceMiningProposals', 'blasting_other_info'),
+    'Mining Total Quarry Area': ('data', 'clearence', 'forestClearanceMiningProposals', 'total_quarry_area'),
+    'Mining Quarry Other Info': ('data', 'clearence', 'forestClearanceMiningProposals', 'quarry_other_info'),
+    'Mining Transportation Mode From Pithead': ('data', 'clearence', 'forestClearanceMiningProposals', 'transportation_mode_from_pithead'),
+    'Mining Transportation Mode From Loading': ('data', 'clearence', 'forestClearanceMiningProposals', 'transportation_mode_from_loading'),
+    'Mining Transportation Mode Other Info': ('data', 'clearence', 'forestClearanceMiningProposals', 'transportation_mode_other_info'),
+    'Mining Plantation Area': ('data', 'clearence', 'forestClearanceMiningProposals', 'plantation_area'),
+    'Mining Water Body': ('data', 'clearence', 'forestClearanceMiningProposals', 'water_body'),
+    'Mining Public Use': ('data', 'clearence', 'forestClearanceMiningProposals', 'public_use'),
+    'Mining Other Use': ('data', 'clearence', 'forestClearanceMiningProposals', 'other_use'),
+    
+    # Organization and Applicant fields from commonFormDetail
+    'Organization Street': ('data', 'clearence', 'commonFormDetail', 'organization_street'),
+    'Organization City': ('data', 'clearence', 'commonFormDetail', 'organization_city'),
+    'Organization State': ('data', 'clearence', 'commonFormDetail', 'organization_state'),
+    'Organization Legal Status': ('data', 'clearence', 'commonFormDetail', 'organization_legal_status'),
+    'Applicant Designation': ('data', 'clearence', 'commonFormDetail', 'applicant_designation'),
+    'Applicant City': ('data', 'clearence', 'commonFormDetail', 'applicant_city'),
+    'Applicant State': ('data', 'clearence', 'commonFormDetail', 'applicant_state'),
+}
+
+def build_field_trie(fields: Dict[str, tuple]) -> Dict[Any, list]:
+    """Build a prefix trie of field paths so shared prefixes are walked once.
+
+    Each node maps a key to a ``[children, field_names]`` pair, where
+    ``field_names`` lists the output fields whose path ends at that key.
+    """
+    trie = {}
+    for field, keys in fields.items():
+        node = trie
+        for key in keys[:-1]:
+            node = node.setdefault(key, [{}, []])[0]
+        node.setdefault(keys[-1], [{}, []])[1].append(field)
+    return trie
+
+def compile_field_extractor(trie: Dict[Any, list]) -> Callable[[Any, Dict[str, Any]], None]:
+    """Generate a function that extracts every field in the trie with straight-line code.
+
+    Each trie node becomes one subscript bound to a local variable, nested under
+    its parent, so the data is walked without interpreting the trie at runtime.
+    The generated code for a single node looks like:
+
+        try:
+            d3 = d2['state']
+        except (KeyError, IndexError, TypeError):
+            d3 = None
+        if d3 is not None:
+            results['State'] = d3
+    """
+    lines = ['def extract_fields(d0, results):']
+    names = itertools.count(1)
+
+    def emit(node: Dict[Any, list], parent: str, indent: str) -> None:
+        for key, (children, fields) in node.items():
+            child = f'd{next(names)}'
+            lines.append(f'{indent}try:')
+            lines.append(f'{indent}    {child} = {parent}[{key!r}]')
+            lines.append(f'{indent}except (KeyError, IndexError, TypeError):')
+            lines.append(f'{indent}    {child} = None')
+            lines.append(f'{indent}if {child} is not None:')
+            for field in fields:
+                lines.append(f'{indent}    results[{field!r}] = {child}')
+            if children:
+                emit(children, child, indent + '    ')
+
+    emit(trie, 'd0', '    ')
+    namespace = {}
+    exec(compile('\n'.join(lines), '<field extractor>', 'exec'), namespace)
+    return namespace['extract_fields']
+
+extract_fields = compile_field_extractor(build_field_trie(fields_to_extract))
+
 def extract_values(data: Dict[str, Any]) -> Dict[str, Any]:
     """Extracts available values from the data"""
     results = {}
     
-    fields_to_extract = {
-        'ID': ('data', 'proponentApplications', 'id'),
-        'Category': ('data', 'proponentApplications', 'applications', 'category'),
-        'Description': ('data', 'proponentApplications', 'applications', 'description'),
-
-
-        'Proposal Number': ('data', 'proponentApplications', 'proposal_no'),
-        'Application Date': ('data', 'proponentApplications', 'created_on'),
-        'Project Name': ('data', 'proponentApplications', 'projectDetailDto', 'projectName'),
-        'Project Description': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'project_description'),
-        'Total Cost (Lakhs)': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafProjectActivityCost', 'total_cost'),
-        'Employment (Construction)': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafProjectActivityCost', 'cp_total_employment'),
-        'Employment (Operational)': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafProjectActivityCost', 'op_existing_total_employment'),
-        'Project Land Requirement (Hectares)': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafLocationOfKml', 'existing_total_land'),
-        'Organization Name': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'organization_name'),
-        'Project Category (Code)': ('data', 'clearence', 'project_category'),
-        'Project Category': ('data', 'clearence', 'environmentClearanceProjectActivityDetails', 0, 'activities', 'name'),
-        
-        # Geographic information fields
-        
-        'Plot Number': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafKML', 0, 'cafKMLPlots', 0, 'plot_no'),
-        'Village': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafKML', 0, 'cafKMLPlots', 0, 'village'),
-        'Sub District': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafKML', 0, 'cafKMLPlots', 0, 'sub_District'),
-        'District': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafKML', 0, 'cafKMLPlots', 0, 'district'),
-        'State': ('data', 'proponentApplications', 'state'),
-        'Village Code': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafKML', 0, 'cafKMLPlots', 0, 'village_code'),
-        
-    
-       'Proposal Type': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'proposal_for'),
-        'MoEFCC File': ('data', 'proponentApplications', 'moefccFileNumber'),
-        'State File': ('data', 'proponentApplications', 'stateFileNumber'),
-        'Plot Nos': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafKML', 0, 'cafKMLPlots', 0, 'plot_no'),
-        'Shape of Project': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafLocationOfKml', 'shape_of_project'),
-        'Existing Non-Forest Land': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafLocationOfKml', 'existing_non_forest_land'),
-        'Existing Forest Land': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafLocationOfKml', 'existing_forest_land'),
-        'Existing Total Land': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafLocationOfKml', 'existing_total_land'),
-        'Additional Non-Forest Land': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafLocationOfKml', 'additional_non_forest_land'),
-        'Additional Forest Land': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafLocationOfKml', 'additional_forest_land'),
-        'Additional Total Land': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafLocationOfKml', 'additional_total_land'),
-        'Existing Cost': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafProjectActivityCost', 'total_existing_cost'),
-        'Expansion Cost': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafProjectActivityCost', 'total_expension_cost'),
-        'Villages Affected': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafOthers', 'no_of_villages'),
-        'Project Displaced Families': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafOthers', 'no_of_project_displaced_families'),
-        'Project Affected Families': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafOthers', 'no_of_project_affected_families'),
-        'Alternative Site Examined': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafOthers', 'is_alternative_sites_examined'),
-        'Alternative Site Description': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafOthers', 'alternative_sites_description'),
-        'Government Restriction': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafOthers', 'is_any_govt_restriction'),
-        'Litigation Pending': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafOthers', 'is_any_litigation_pending'),
-        'Violation Involved': ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails', 0, 'cafOthers', 'is_any_violayion_involved'),
-        'Last Visible Status': ('data', 'proponentApplications', 'last_visible_status'),
-        'Last Submission Date': ('data', 'proponentApplications', 'last_submission_date'),
-        'Grant Date': ('data', 'proponentApplications', 'grant_date'),
-        'Project Exemption Reason': ('data', 'clearence', 'project_exempted_reason'),
-        'EC Consultant': ('data', 'clearence', 'ecConsultant', 'consultant_name'),
-        
-        # Compensatory Afforestation fields
-        'Compensatory Afforestation Type': ('data', 'clearence', 'fcAforestationDetails', 'comp_afforestation_type'),
-        'Is Applicable Compensatory Afforestation': ('data', 'clearence', 'fcAforestationDetails', 'is_applicable_compensatory_afforestation'),
-        
-        # Mining Proposal fields
-        'Mining Date of Issue': ('data', 'clearence', 'forestClearanceMiningProposals', 'date_of_issue'),
-        'Mining Date of Validity': ('data', 'clearence', 'forestClearanceMiningProposals', 'date_of_validity'),
-        'Mining Lease Period': ('data', 'clearence', 'forestClearanceMiningProposals', 'lease_period'),
-        'Mining Date of Expiry': ('data', 'clearence', 'forestClearanceMiningProposals', 'date_of_expiry'),
-        'Mining Lease Area': ('data', 'clearence', 'forestClearanceMiningProposals', 'lease_area'),
-        'Mining Production Capacity': ('data', 'clearence', 'forestClearanceMiningProposals', 'production_capacity'),
-        'Mining Other Info': ('data', 'clearence', 'forestClearanceMiningProposals', 'other_info'),
-        'Mining Status of Approval': ('data', 'clearence', 'forestClearanceMiningProposals', 'status_of_approval'),
-        'Mining Approved Life of Mine': ('data', 'clearence', 'forestClearanceMiningProposals', 'approved_life_of_mine'),
-        'Mining Approving Authority Name': ('data', 'clearence', 'forestClearanceMiningProposals', 'approving_authority_name'),
-        'Mining Life of Mine Other Info': ('data', 'clearence', 'forestClearanceMiningProposals', 'life_of_mine_other_info'),
-        'Mining Type of Mining': ('data', 'clearence', 'forestClearanceMiningProposals', 'type_of_mining'),
-        'Mining Method of Mining': ('data', 'clearence', 'forestClearanceMiningProposals', 'method_of_mining'),
-        'Mining Type of Mining Other Info': ('data', 'clearence', 'forestClearanceMiningProposals', 'type_of_mining_other_info'),
-        'Mining Blasting Other Info': ('data', 'clearence', 'forestClearanceMiningProposals', 'blasting_other_info'),
-        'Mining Total Quarry Area': ('data', 'clearence', 'forestClearanceMiningProposals', 'total_quarry_area'),
-        'Mining Quarry Other Info': ('data', 'clearence', 'forestClearanceMiningProposals', 'quarry_other_info'),
-        'Mining Transportation Mode From Pithead': ('data', 'clearence', 'forestClearanceMiningProposals', 'transportation_mode_from_pithead'),
-        'Mining Transportation Mode From Loading': ('data', 'clearence', 'forestClearanceMiningProposals', 'transportation_mode_from_loading'),
-        'Mining Transportation Mode Other Info': ('data', 'clearence', 'forestClearanceMiningProposals', 'transportation_mode_other_info'),
-        'Mining Plantation Area': ('data', 'clearence', 'forestClearanceMiningProposals', 'plantation_area'),
-        'Mining Water Body': ('data', 'clearence', 'forestClearanceMiningProposals', 'water_body'),
-        'Mining Public Use': ('data', 'clearence', 'forestClearanceMiningProposals', 'public_use'),
-        'Mining Other Use': ('data', 'clearence', 'forestClearanceMiningProposals', 'other_use'),
-        
-        # Organization and Applicant fields from commonFormDetail
-        'Organization Street': ('data', 'clearence', 'commonFormDetail', 'organization_street'),
-        'Organization City': ('data', 'clearence', 'commonFormDetail', 'organization_city'),
-        'Organization State': ('data', 'clearence', 'commonFormDetail', 'organization_state'),
-        'Organization Legal Status': ('data', 'clearence', 'commonFormDetail', 'organization_legal_status'),
-        'Applicant Designation': ('data', 'clearence', 'commonFormDetail', 'applicant_designation'),
-        'Applicant City': ('data', 'clearence', 'commonFormDetail', 'applicant_city'),
-        'Applicant State': ('data', 'clearence', 'commonFormDetail', 'applicant_state'),
-    }
-
-    for field, keys in fields_to_extract.items():
-        value = safe_get(data, *keys)
-        if value is not None:
-            results[field] = value
+    extract_fields(data, results)
+
+    # Resolve the subtrees shared by the KML and document lookups once
+    common_form_details = safe_get(data, ('data', 'proponentApplications', 'projectDetailDto', 'commonFormDetails'))
+    clearence = safe_get(data, ('data', 'clearence'))
 
     # Extract KML URLs
-    kml_urls = extract_kml_urls(data)
+    kml_urls = extract_kml_urls(common_form_details, clearence)
     if kml_urls:
         results['KML URLs'] = ';'.join(kml_urls)  # Join multiple URLs with semicolon
 
     # EIA Report PDF URL
-    eia = safe_get(data, 'data', 'proponentApplications', 'ecEnclosures', 'eia_final_copy')
+    eia = safe_get(data, ('data', 'proponentApplications', 'ecEnclosures', 'eia_final_copy'))
     if eia and isinstance(eia, dict):
-        doc_id = eia.get('document_mapping_id')
-        ref_id = eia.get('ref_id')
-        ref_type = eia.get('type')
-        uuid = eia.get('uuid')
-        version = eia.get('version')
-        if all([doc_id, ref_id, ref_type, uuid, version]):
-            eia_url = f"https://parivesh.nic.in/dms/okm/downloadDocument?docTypemappingId={doc_id}&refId={ref_id}&refType={ref_type}&uuid={uuid}&version={version}"
+        eia_url = document_url(eia)
+        if eia_url:
             results['EIA Report PDF'] = eia_url
 
     # Cost Benefit Report PDF URL
-    cost_benefit_report = safe_get(data, 'data', 'clearence', 'fcOthersDetail', 'cost_benefit_report')
+    cost_benefit_report = safe_get(clearence, ('fcOthersDetail', 'cost_benefit_report'))
     if cost_benefit_report and isinstance(cost_benefit_report, dict):
-        doc_id = cost_benefit_report.get('document_mapping_id')
-        ref_id = cost_benefit_report.get('ref_id')
-        ref_type = cost_benefit_report.get('type')
-        uuid = cost_benefit_report.get('uuid')
-        version = cost_benefit_report.get('version')
-        if all([doc_id, ref_id, ref_type, uuid, version]):
-            cost_benefit_url = f"https://parivesh.nic.in/dms/okm/downloadDocument?docTypemappingId={doc_id}&refId={ref_id}&refType={ref_type}&uuid={uuid}&version={version}"
+        cost_benefit_url = document_url(cost_benefit_report)
+        if cost_benefit_url:
             results['Cost Benefit Report PDF'] = cost_benefit_url
 
     # Mining array fields - estimated reserves (concatenated)
-    mining_proposal = safe_get(data, 'data', 'clearence', 'forestClearanceMiningProposals')
+    mining_proposal = safe_get(clearence, ('forestClearanceMiningProposals',))
     if mining_proposal and isinstance(mining_proposal, dict):
         # Estimated Reserve Minerals
         estimated_reserves = mining_proposal.get('estimatedReserveMinerals', [])
         if estimated_reserves and isinstance(estimated_reserves, list):
-            names = [str(reserve.get('estimated_reserves_name', '')) for reserve in estimated_reserves if reserve.get('estimated_reserves_name')]
-            fl_values = [str(reserve.get('estimated_reserves_fl', '')) for reserve in estimated_reserves if reserve.get('estimated_reserves_fl') is not None]
-            nfl_values = [str(reserve.get('estimated_reserves_nfl', '')) for reserve in estimated_reserves if reserve.get('estimated_reserves_nfl') is not None]
+            # Collect all three fields in a single pass over the reserves
+            names, fl_values, nfl_values = [], [], []
+            for reserve in estimated_reserves:
+                if not isinstance(reserve, dict):
+                    continue
+                name = reserve.get('estimated_reserves_name')
+                if name:
+                    names.append(str(name))
+                fl = reserve.get('estimated_reserves_fl')
+                if fl is not None:
+                    fl_values.append(str(fl))
+                nfl = reserve.get('estimated_reserves_nfl')
+                if nfl is not None:
+                    nfl_values.append(str(nfl))
             
             if names:
                 results['Mining Estimated Reserve Names'] = ','.join(names)
@@ -318,10 +541,23 @@ def extract_values(data: Dict[str, Any]) -> Dict[str, Any]:
         # Mining Mineral Reserves
         mineral_reserves = mining_proposal.get('miningMineralReserves', [])
         if mineral_reserves and isinstance(mineral_reserves, list):
-            proved_reserves = [str(reserve.get('proved_reserves', '')) for reserve in mineral_reserves if reserve.get('proved_reserves') is not None]
-            indicated_reserves = [str(reserve.get('indicated_reserves', '')) for reserve in mineral_reserves if reserve.get('indicated_reserves') is not None]
-            inferred_reserves = [str(reserve.get('inferred_reserves', '')) for reserve in mineral_reserves if reserve.get('inferred_reserves') is not None]
-            mineable_reserves = [str(reserve.get('mineable_reserves', '')) for reserve in mineral_reserves if reserve.get('mineable_reserves') is not None]
+            # Collect all four fields in a single pass over the reserves
+            proved_reserves, indicated_reserves, inferred_reserves, mineable_reserves = [], [], [], []
+            for reserve in mineral_reserves:
+                if not isinstance(reserve, dict):
+                    continue
+                proved = reserve.get('proved_reserves')
+                if proved is not None:
+                    proved_reserves.append(str(proved))
+                indicated = reserve.get('indicated_reserves')
+                if indicated is not None:
+                    indicated_reserves.append(str(indicated))
+                inferred = reserve.get('inferred_reserves')
+                if inferred is not None:
+                    inferred_reserves.append(str(inferred))
+                mineable = reserve.get('mineable_reserves')
+                if mineable is not None:
+                    mineable_reserves.append(str(mineable))
             
             if proved_reserves:
                 results['Mining Proved Reserves'] = ','.join(proved_reserves)
@@ -336,16 +572,16 @@ def extract_values(data: Dict[str, Any]) -> Dict[str, Any]:
         dumping_strategy = mining_proposal.get('dumping_strategy')
         if dumping_strategy and isinstance(dumping_strategy, str):
             try:
-                dumping_data = json.loads(dumping_strategy)
+                dumping_data = _json.loads(dumping_strategy)
                 if isinstance(dumping_data, dict):
                     results['Mining External Dumping Remarks'] = dumping_data.get('external_dumping_remarks', '')
                     results['Mining Internal Dumping Remarks'] = dumping_data.get('internal_dumping_remarks', '')
                     results['Mining Topsoil Dumping Remarks'] = dumping_data.get('toposoil_dumping_remarks', '')
-            except json.JSONDecodeError:
+            except _json.JSONDecodeError:
                 pass
 
     # Forest Clearance Patch KML Details - Present Owner (concatenated)
-    patch_kmls = safe_get(data, 'data', 'clearence', 'forestClearancePatchKmls')
+    patch_kmls = safe_get(clearence, ('forestClearancePatchKmls',))
     if patch_kmls and isinstance(patch_kmls, list):
         present_owners = []
         for patch_kml in patch_kmls:
@@ -361,52 +597,78 @@ def extract_values(data: Dict[str, Any]) -> Dict[str, Any]:
     return results
 
 def main():
-    json_files = recursive_find_json(directory)
+    # Get state parameter from command line arguments
+    state_param = sys.argv[1] if len(sys.argv) > 1 else None
+    directory = get_directory_path(state_param)
+    
+    print(f"Processing data from directory: {directory}")
+    
+    if not os.path.exists(directory):
+        print(f"Error: Directory {directory} does not exist. Please run initialize.sh and fetch.sh first.")
+        sys.exit(1)
     
-    if not json_files:
+    print("Processing files...")
+    
+    # Files are independent, so parse them across all cores in batches. Each
+    # worker returns its batch as per-column lists, which pickle far more compactly
+    # than one dict per record. Discovery is lazy and only a few batches per worker
+    # are in flight, so workers start parsing while the tree is still being walked
+    # and files are prefetched just ahead of them. Batches are merged into one list
+    # per column (with None for missing fields) as they arrive.
+    columns = {}
+    file_count = 0
+    record_count = 0
+    errors = []
+    workers = os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        batches = batched(prefetch_files(recursive_find_json(directory)), 64)
+        for batch_columns, batch_count, batch_errors, batch_size in map_bounded(executor, parse_json_batch, batches, 2 * workers):
+            file_count += batch_size
+            errors.extend(batch_errors)
+            intern_low_cardinality(batch_columns)
+            for field in batch_columns:
+                if field not in columns:
+                    columns[field] = [None] * record_count
+            for field, column in columns.items():
+                column.extend(batch_columns.get(field) or [None] * batch_count)
+            record_count += batch_count
+    
+    if not file_count:
         print(f"No JSON files found in {directory}")
         return
     
-    print(f"Processing {len(json_files)} files...")
+    print(f"Processed {file_count} files")
     
-    # Use Polars to efficiently process the data
-    data_list = []
-    for file_path in json_files:
-        result = parse_json(file_path)
-        if result:  # Only add non-empty results
-            data_list.append(result)
+    # Errors are reported here rather than by the workers, so they don't interleave with progress output
+    if errors:
+        print(f"Failed to process {len(errors)} files; first {min(len(errors), 5)}:")
+        for error in errors[:5]:
+            print(f"  {error}")
     
-    if not data_list:
+    if not record_count:
         print("No valid data found to process")
         return
     
-    # Normalize data - ensure all records have all possible fields
-    # This is necessary because Polars excludes columns that are missing from most records
-    all_fields = set()
-    for record in data_list:
-        all_fields.update(record.keys())
-    
-    # Normalize each record to have all fields (with None for missing ones)
-    normalized_data_list = []
-    for record in data_list:
-        normalized_record = {}
-        for field in all_fields:
-            normalized_record[field] = record.get(field, None)
-        normalized_data_list.append(normalized_record)
+    # Build the frame straight from the column lists with an explicit schema, so
+    # Polars does not infer types row by row
+    df = pl.DataFrame(columns, schema=column_schema(columns), strict=False)
     
-    # Create DataFrame with increased schema inference to handle mixed types
-    df = pl.DataFrame(normalized_data_list, infer_schema_length=len(normalized_data_list))
+    # Everything from here on is a single lazy query, so Polars fuses the
+    # transformations and streams the result straight into the CSV
+    lf = df.lazy().with_columns(
+        pl.format("https://parivesh.nic.in/newupgrade/#/report/ec?proposalId={}", pl.col('proposal_id')).alias('proposal_url')
+    ).drop('proposal_id')
+    column_names = lf.collect_schema().names()
     
     # Filter rows to keep only those with a valid 'Proposal Number'
-    if 'Proposal Number' in df.columns:
-        df = df.filter(pl.col('Proposal Number').is_not_null())
+    # (the row count comes from the column's null count, so the plan only runs once, in sink_csv)
+    total_records = df.height
+    if 'Proposal Number' in column_names:
+        lf = lf.filter(pl.col('Proposal Number').is_not_null())
+        total_records -= df.get_column('Proposal Number').null_count()
     
-    # Replace newlines with semicolons in string columns
-    for col in df.columns:
-        if df[col].dtype == pl.Utf8:
-            df = df.with_columns(
-                pl.col(col).str.strip_chars().alias(col)
-            )
+    # Strip surrounding whitespace in string columns, in a single projection
+    lf = lf.with_columns(cs.string().str.strip_chars())
     
     # Reorder columns - put specified columns first, then remaining columns
     preferred_order = [
@@ -516,20 +778,20 @@ def main():
     ]
     
     # Get columns that exist in the dataframe from the preferred order
-    existing_preferred = [col for col in preferred_order if col in df.columns]
+    existing_preferred = [col for col in preferred_order if col in column_names]
     
     # Get remaining columns that aren't in the preferred order
-    remaining_cols = [col for col in df.columns if col not in preferred_order]
+    remaining_cols = [col for col in column_names if col not in preferred_order]
     
     # Combine to create final column order
     final_column_order = existing_preferred + remaining_cols
     
     # Reorder the dataframe columns
-    df = df.select(final_column_order)
+    lf = lf.select(final_column_order)
     
-    # Sort by Application Date in descending order
-    if 'Application Date' in df.columns:
-        df = df.sort('Application Date')
+    # Sort by Application Date in ascending order
+    if 'Application Date' in column_names:
+        lf = lf.sort('Application Date')
     
     # Ensure the output directory exists
     os.makedirs("csv", exist_ok=True)
@@ -543,9 +805,9 @@ def main():
         print("Processing data for all states")
     
     # Write to CSV
-    df.write_csv(output_file)
+    lf.sink_csv(output_file)
     print(f"Data saved to {output_file}")
-    print(f"Total records: {len(df)}")
+    print(f"Total records: {total_records}")
 
 if __name__ == "__main__":
     main()
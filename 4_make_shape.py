@@ -7,14 +7,50 @@ import os
 import sys
 import csv
 import json
+import re
+import hashlib
+import sqlite3
+import asyncio
 import urllib.parse
-import subprocess
 from pathlib import Path
-from typing import Dict, List, Any, Optional
-from xml.etree import ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
+from request import ParallelDownloader, is_kml, kml_sniff_bytes
+
+try:
+    from lxml import etree as ET
+    # lxml filters for Placemark end events (in any namespace) in C
+    iterparse_options = {'huge_tree': False, 'tag': '{*}Placemark'}
+    kml_parser = 'lxml'
+except ImportError:
+    from xml.etree import ElementTree as ET
+    iterparse_options = {}
+    kml_parser = 'stdlib'
+
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Encoding named in an XML declaration
+xml_encoding_pattern = re.compile(rb'<\?xml[^>]*encoding=["\']([^"\']+)')
+
+# refId/uuid query parameters of plain (unescaped, fragment-free) KML download URLs
+kml_param_pattern = re.compile(r'(?:^|&)(refId|uuid)=([^&]+)')
 
 def generate_kml_filename(url: str) -> str:
     """Generate filename from KML URL parameters"""
+    # Fast path for the usual parivesh URLs, which need no unquoting
+    if not any(c in url for c in '#%+'):
+        params = {}
+        for key, value in kml_param_pattern.findall(url.partition('?')[2]):
+            params.setdefault(key, value)
+        if len(params) == 2:
+            return f"{params['refId']}_{params['uuid'][:8]}.kml"
+    
     try:
         parsed_url = urllib.parse.urlparse(url)
         query_params = urllib.parse.parse_qs(parsed_url.query)
@@ -25,225 +61,420 @@ def generate_kml_filename(url: str) -> str:
         return f"{ref_id}_{uuid}.kml"
     except:
         # Fallback to hash of URL if parsing fails
-        import hashlib
         return f"kml_{hashlib.md5(url.encode()).hexdigest()[:8]}.kml"
 
-def generate_kml_url_file(csv_path: str, url_file_path: str, kml_dir: Path) -> int:
-    """Generate URL file for batch downloading KML files"""
-    url_count = 0
+def csv_row_dict(header: List[str], values: List[str]) -> Dict[str, Any]:
+    """Build a row dict from CSV values the way csv.DictReader does"""
+    row = dict(zip(header, values))
+    if len(values) > len(header):
+        row[None] = values[len(header):]
+    elif len(values) < len(header):
+        for key in header[len(values):]:
+            row[key] = None
+    return row
+
+def generate_kml_url_file(csv_path: str, url_file_path: str, kml_dir: Path) -> Tuple[List[Tuple[int, Dict[str, Any], List[Path]]], int]:
+    """Generate URL file for batch downloading KML files
+    
+    Returns the CSV rows that have KML URLs, each with its row number and the
+    paths its KML files are downloaded to, along with the total number of rows.
+    Only those rows are turned into dicts, so the CSV is not read again later.
+    """
+    projects = []
+    row_count = 0
+    lines = []
     
     with open(csv_path, 'r', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
+        reader = csv.reader(csvfile)
+        header = next(reader, [])
+        columns = {name: i for i, name in enumerate(header)}
+        id_col = columns.get('ID')
+        urls_col = columns.get('KML URLs')
         
-        with open(url_file_path, 'w') as url_file:
-            for row in reader:
-                project_id = row.get('ID', '')
-                kml_urls_str = row.get('KML URLs', '')
+        for values in reader:
+            # Skip blank lines like DictReader
+            if not values:
+                continue
+            row_count += 1
+            
+            if urls_col is None or urls_col >= len(values) or not values[urls_col]:
+                continue
                 
-                if not kml_urls_str:
-                    continue
-                    
-                # Parse multiple URLs separated by semicolon
-                kml_urls = [url.strip() for url in kml_urls_str.split(';') if url.strip()]
+            # Parse multiple URLs separated by semicolon
+            kml_urls = [url.strip() for url in values[urls_col].split(';') if url.strip()]
+            if not kml_urls:
+                continue
+            
+            project_id = values[id_col] if id_col is not None and id_col < len(values) else ''
+            project_dir = kml_dir / project_id
+            kml_paths = []
+            
+            for url in kml_urls:
+                # Create project-specific output path
+                filename = generate_kml_filename(url)
+                output_path = project_dir / filename
                 
-                for url in kml_urls:
-                    # Create project-specific output path
-                    filename = generate_kml_filename(url)
-                    output_path = kml_dir / project_id / filename
-                    
-                    # Write URL and output path to file (tab-separated)
-                    url_file.write(f"{url}\t{output_path}\n")
-                    url_count += 1
+                # URL and output path (tab-separated)
+                lines.append(f"{url}\t{output_path}\n")
+                kml_paths.append(output_path)
+            
+            projects.append((row_count, csv_row_dict(header, values), kml_paths))
     
-    return url_count
+    # Write the URL file in one call
+    with open(url_file_path, 'w') as url_file:
+        url_file.write(''.join(lines))
+    
+    return projects, row_count
 
 def batch_download_kmls(url_file_path: str) -> bool:
-    """Use request.py to batch download KML files"""
+    """Use request.py's downloader in-process to batch download KML files"""
     try:
-        # Call request.py with appropriate parameters for KML downloads
-        cmd = [
-            'python3', 'request.py', url_file_path,
-            '--content-type', 'kml',
-            '--http-method', 'GET',
-            '--min-batch-size', '5',
-            '--max-batch-size', '15',
-            '--min-delay', '1.0', 
-            '--max-delay', '3.0',
-            '--max-concurrent', '8'
-        ]
+        downloader = ParallelDownloader(
+            min_batch_size=5,
+            max_batch_size=15,
+            min_delay=1.0,
+            max_delay=3.0,
+            max_concurrent=8,
+            content_type='kml',
+            http_method='GET'
+        )
+        
+        urls_to_download = downloader.filter_existing_files(downloader.parse_url_file(url_file_path))
+        print(f"Skipped {downloader.skipped} existing files")
+        print(f"Need to download {len(urls_to_download)} files")
         
-        result = subprocess.run(cmd, capture_output=False, text=True)
-        return result.returncode == 0
+        if urls_to_download:
+            asyncio.run(downloader.process_downloads(urls_to_download))
         
+        print(f"Downloaded: {downloader.downloaded}, Failed: {downloader.failed}")
+        return downloader.failed == 0
+        
+    except SystemExit:
+        # parse_url_file exits on an unreadable URL file, as request.py's CLI expects;
+        # here only the download step fails and the run carries on
+        return False
     except Exception as e:
         print(f"Error running batch downloader: {e}")
         return False
 
-def parse_kml_coordinates(coord_string: str) -> List[List[float]]:
-    """Parse KML coordinate string into list of [lon, lat] pairs
+def parse_kml_coordinates(coord_string: str) -> np.ndarray:
+    """Parse KML coordinate string into an (N, 2) array of [lon, lat] pairs
     
     KML coordinates are formatted as: lon1,lat1,alt1 lon2,lat2,alt2 lon3,lat3,alt3
     where coordinate triplets are separated by whitespace, and values within
     a triplet are separated by commas.
+    
+    Well-formed strings, where every tuple has the same number of values, are
+    converted in one NumPy call; anything else goes through the per-triplet parser.
     """
-    coordinates = []
+    coord_triplets = coord_string.split()
+    if not coord_triplets:
+        return np.empty((0, 2))
     
-    # Clean up the coordinate string
-    coord_string = coord_string.strip()
+    # Every tuple must have as many values as the first one for the vectorized path
+    separators = coord_triplets[0].count(',')
+    stride = separators + 1
+    if stride >= 2 and all(triplet.count(',') == separators for triplet in coord_triplets):
+        try:
+            values = np.array(coord_string.replace(',', ' ').split(), dtype=np.float64)
+        except ValueError:
+            values = None
+        if values is not None and values.size == len(coord_triplets) * stride:
+            # Ignore altitude if present
+            return np.ascontiguousarray(values.reshape(-1, stride)[:, :2])
     
-    # Split by whitespace to get individual coordinate triplets
-    coord_triplets = coord_string.split()
+    return np.array(parse_kml_coordinate_triplets(coord_triplets), dtype=np.float64).reshape(-1, 2)
+
+def parse_kml_coordinate_triplets(coord_triplets: List[str]) -> List[List[float]]:
+    """Parse whitespace-split KML coordinate triplets one at a time, skipping invalid ones"""
+    coordinates = []
+    append = coordinates.append
     
     for triplet in coord_triplets:
-        # Split each triplet by commas to get lon, lat, and optionally altitude
-        parts = triplet.split(',')
+        # Split off lon and lat only; altitude (and anything after it) is never converted
+        parts = triplet.split(',', 2)
+        if len(parts) < 2:
+            continue
         
         try:
-            if len(parts) >= 2:
-                lon = float(parts[0])
-                lat = float(parts[1])
-                # Ignore altitude (parts[2]) if present
-                coordinates.append([lon, lat])
-        except (ValueError, IndexError):
+            append([float(parts[0]), float(parts[1])])
+        except ValueError:
             # Skip invalid coordinate triplets
             continue
             
     return coordinates
 
-def kml_to_geojson_feature(kml_path: Path, csv_row: Dict[str, Any]) -> List[Dict[str, Any]]:
-    """Convert KML file to GeoJSON features with CSV attributes"""
+@lru_cache(maxsize=None)
+def kml_find_paths(ns_uri: str) -> Dict[str, str]:
+    """Namespace-qualified tags and child paths for the elements read from each placemark"""
+    def qualify(path: str) -> str:
+        if not ns_uri:
+            return path
+        return '/'.join(f'{{{ns_uri}}}{part}' for part in path.split('/'))
+    
+    return {
+        'name': qualify('name'),
+        'description': qualify('description'),
+        'point': qualify('Point'),
+        'linestring': qualify('LineString'),
+        'polygon': qualify('Polygon'),
+        'multigeometry': qualify('MultiGeometry'),
+        'coordinates': qualify('coordinates'),
+        'outer': qualify('outerBoundaryIs/LinearRing/coordinates'),
+        'inner': qualify('innerBoundaryIs/LinearRing/coordinates'),
+    }
+
+def collect_geometries(element, paths: Dict[str, str], geometries: Dict[str, Any]):
+    """Record the first Point and LineString coordinates and the first Polygon among an element's children
+    
+    MultiGeometry children are walked in document order, so the first of each
+    geometry type is the same one a descendant search would find.
+    """
+    for child in element:
+        tag = child.tag
+        if tag == paths['polygon']:
+            geometries.setdefault('polygon', child)
+        elif tag == paths['point'] or tag == paths['linestring']:
+            kind = 'point' if tag == paths['point'] else 'linestring'
+            if kind not in geometries:
+                coordinates = child.find(paths['coordinates'])
+                if coordinates is not None:
+                    geometries[kind] = coordinates
+        elif tag == paths['multigeometry']:
+            collect_geometries(child, paths, geometries)
+
+def close_ring(coords: np.ndarray) -> np.ndarray:
+    """Append the first position to a ring if it is not already closed"""
+    if np.array_equal(coords[0], coords[-1]):
+        return coords
+    return np.vstack((coords, coords[:1]))
+
+def encode_json(value: Any) -> bytes:
+    """Serialize a value that may contain NumPy arrays to compact JSON"""
+    if orjson is not None:
+        # Over-long CSV rows keep their extra cells under a None key, like csv.DictReader;
+        # json.dumps writes that key as "null", and OPT_NON_STR_KEYS makes orjson do the same
+        return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=np.ndarray.tolist).encode('utf-8')
+
+def encode_feature(feature: Dict[str, Any], encoded_properties: Optional[bytes] = None) -> bytes:
+    """Serialize a GeoJSON feature, reusing its already serialized properties if given"""
+    if encoded_properties is None:
+        encoded_properties = encode_json(feature["properties"])
+    return b'{"type":"Feature","properties":' + encoded_properties + b',"geometry":' + encode_json(feature["geometry"]) + b'}'
+
+def placemark_to_feature(placemark, shared_properties: Dict[str, Any], paths: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """Convert a single KML Placemark element to a GeoJSON feature, or None without valid geometry
+    
+    shared_properties is used as-is unless the placemark has its own name or
+    description, in which case those are added to a copy.
+    """
+    feature = {
+        "type": "Feature",
+        "properties": shared_properties,
+        "geometry": None
+    }
+    
+    # Add placemark name and description if available
+    name_elem = placemark.find(paths['name'])
+    desc_elem = placemark.find(paths['description'])
+    has_name = name_elem is not None and name_elem.text
+    has_desc = desc_elem is not None and desc_elem.text
+    if has_name or has_desc:
+        feature["properties"] = dict(shared_properties)
+        if has_name:
+            feature["properties"]["kml_name"] = name_elem.text
+        if has_desc:
+            feature["properties"]["kml_description"] = desc_elem.text
+    
+    # Handle different geometry types, found in one pass over the placemark's children
+    geometries = {}
+    collect_geometries(placemark, paths, geometries)
+    
+    # Point
+    point = geometries.get('point')
+    if point is not None and point.text:
+        coords = parse_kml_coordinates(point.text)
+        if len(coords):
+            feature["geometry"] = {
+                "type": "Point",
+                "coordinates": coords[0]
+            }
+    
+    # LineString
+    linestring = geometries.get('linestring')
+    if linestring is not None and linestring.text:
+        coords = parse_kml_coordinates(linestring.text)
+        if len(coords):
+            # Validate LineString has at least 2 points
+            if len(coords) >= 2:
+                feature["geometry"] = {
+                    "type": "LineString",
+                    "coordinates": coords
+                }
+            elif len(coords) == 1:
+                # Convert single-point LineString to Point
+                feature["geometry"] = {
+                    "type": "Point",
+                    "coordinates": coords[0]
+                }
+    
+    # Polygon
+    polygon = geometries.get('polygon')
+    if polygon is not None:
+        # Outer boundary
+        outer_coords = polygon.find(paths['outer'])
+        
+        if outer_coords is not None and outer_coords.text:
+            coords = parse_kml_coordinates(outer_coords.text)
+            if len(coords):
+                # Validate polygon has at least 3 unique points (4 including closure)
+                if len(coords) >= 3:
+                    # Close the polygon if not already closed
+                    coords = close_ring(coords)
+                    
+                    # Final validation - must have at least 4 points after closing
+                    if len(coords) >= 4:
+                        feature["geometry"] = {
+                            "type": "Polygon",
+                            "coordinates": [coords]
+                        }
+                        
+                        # Handle inner boundaries (holes)
+                        for inner in polygon.iterfind(paths['inner']):
+                            if inner.text:
+                                inner_coords = parse_kml_coordinates(inner.text)
+                                if len(inner_coords) >= 3:
+                                    inner_coords = close_ring(inner_coords)
+                                    if len(inner_coords) >= 4:
+                                        feature["geometry"]["coordinates"].append(inner_coords)
+    
+    # Only return features with valid geometry
+    if feature["geometry"] is None:
+        return None
+    return feature
+
+def kml_placemarks_to_features(kml_path: Path, shared_properties: Dict[str, Any], encoding: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Stream a KML file's placemarks with iterparse and convert them to GeoJSON features
+    
+    encoding overrides the document's own; parse errors propagate to the caller.
+    """
     features = []
     
-    try:
-        with open(kml_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except UnicodeDecodeError:
-        try:
-            with open(kml_path, 'r', encoding='latin-1') as f:
-                content = f.read()
-        except:
-            print(f"Could not read {kml_path}")
-            return features
+    options = dict(iterparse_options)
+    if encoding is not None:
+        if kml_parser == 'lxml':
+            options['encoding'] = encoding
+        else:
+            options['parser'] = ET.XMLParser(encoding=encoding)
     
-    try:
-        root = ET.fromstring(content)
+    for _, elem in ET.iterparse(str(kml_path), events=('end',), **options):
+        # Without lxml's tag filter every element arrives here
+        if elem.tag != 'Placemark' and not elem.tag.endswith('}Placemark'):
+            continue
         
-        # Handle namespace
-        ns = {'kml': 'http://www.opengis.net/kml/2.2'}
-        if root.tag.startswith('{'):
-            ns_uri = root.tag.split('}')[0][1:]
-            ns = {'kml': ns_uri}
+        # Look up the placemark's children in its own namespace
+        ns_uri = elem.tag[1:].split('}')[0] if elem.tag.startswith('{') else ''
+        feature = placemark_to_feature(elem, shared_properties, kml_find_paths(ns_uri))
+        if feature is not None:
+            features.append(feature)
         
-        # Find all placemarks
-        placemarks = root.findall('.//kml:Placemark', ns)
-        if not placemarks:
-            placemarks = root.findall('.//Placemark')
+        # Free the converted placemark and, with lxml, any siblings already processed
+        elem.clear()
+        if hasattr(elem, 'getprevious'):
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+    
+    return features
+
+def kml_to_geojson_feature(kml_path: Path, csv_row: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Convert KML file to GeoJSON features with CSV attributes
+    
+    Placemarks are streamed with iterparse and discarded once converted, so
+    memory stays bounded by a single placemark rather than the whole document.
+    """
+    # Placemarks without their own name or description share one copy of the CSV attributes
+    shared_properties = dict(csv_row)
+    
+    try:
+        # Skip HTML error pages and other non-KML downloads without parsing them,
+        # with the same sniff the downloader applies to KML it has fetched
+        with open(kml_path, 'rb') as f:
+            head = f.read(kml_sniff_bytes)
+        if not is_kml(head):
+            print(f"Skipping {kml_path}: not a KML file")
+            return []
         
-        for placemark in placemarks:
-            feature = {
-                "type": "Feature",
-                "properties": dict(csv_row),  # Copy all CSV attributes
-                "geometry": None
-            }
-            
-            # Add placemark name if available
-            name_elem = placemark.find('.//kml:name', ns)
-            if name_elem is None:
-                name_elem = placemark.find('.//name')
-            if name_elem is not None and name_elem.text:
-                feature["properties"]["kml_name"] = name_elem.text
-            
-            # Add placemark description if available
-            desc_elem = placemark.find('.//kml:description', ns)
-            if desc_elem is None:
-                desc_elem = placemark.find('.//description')
-            if desc_elem is not None and desc_elem.text:
-                feature["properties"]["kml_description"] = desc_elem.text
-            
-            # Handle different geometry types
-            
-            # Point
-            point = placemark.find('.//kml:Point/kml:coordinates', ns)
-            if point is None:
-                point = placemark.find('.//Point/coordinates')
-            if point is not None and point.text:
-                coords = parse_kml_coordinates(point.text)
-                if coords:
-                    feature["geometry"] = {
-                        "type": "Point",
-                        "coordinates": coords[0]
-                    }
-            
-            # LineString
-            linestring = placemark.find('.//kml:LineString/kml:coordinates', ns)
-            if linestring is None:
-                linestring = placemark.find('.//LineString/coordinates')
-            if linestring is not None and linestring.text:
-                coords = parse_kml_coordinates(linestring.text)
-                if coords:
-                    # Validate LineString has at least 2 points
-                    if len(coords) >= 2:
-                        feature["geometry"] = {
-                            "type": "LineString",
-                            "coordinates": coords
-                        }
-                    elif len(coords) == 1:
-                        # Convert single-point LineString to Point
-                        feature["geometry"] = {
-                            "type": "Point",
-                            "coordinates": coords[0]
-                        }
-            
-            # Polygon
-            polygon = placemark.find('.//kml:Polygon', ns)
-            if polygon is None:
-                polygon = placemark.find('.//Polygon')
-            if polygon is not None:
-                # Outer boundary
-                outer_coords = polygon.find('.//kml:outerBoundaryIs/kml:LinearRing/kml:coordinates', ns)
-                if outer_coords is None:
-                    outer_coords = polygon.find('.//outerBoundaryIs/LinearRing/coordinates')
-                
-                if outer_coords is not None and outer_coords.text:
-                    coords = parse_kml_coordinates(outer_coords.text)
-                    if coords:
-                        # Validate polygon has at least 3 unique points (4 including closure)
-                        if len(coords) >= 3:
-                            # Close the polygon if not already closed
-                            if coords[0] != coords[-1]:
-                                coords.append(coords[0])
-                            
-                            # Final validation - must have at least 4 points after closing
-                            if len(coords) >= 4:
-                                feature["geometry"] = {
-                                    "type": "Polygon",
-                                    "coordinates": [coords]
-                                }
-                                
-                                # Handle inner boundaries (holes)
-                                inner_boundaries = polygon.findall('.//kml:innerBoundaryIs/kml:LinearRing/kml:coordinates', ns)
-                                if not inner_boundaries:
-                                    inner_boundaries = polygon.findall('.//innerBoundaryIs/LinearRing/coordinates')
-                                
-                                for inner in inner_boundaries:
-                                    if inner.text:
-                                        inner_coords = parse_kml_coordinates(inner.text)
-                                        if inner_coords and len(inner_coords) >= 3:
-                                            if inner_coords[0] != inner_coords[-1]:
-                                                inner_coords.append(inner_coords[0])
-                                            if len(inner_coords) >= 4:
-                                                feature["geometry"]["coordinates"].append(inner_coords)
-            
-            # Only add features with valid geometry
-            if feature["geometry"] is not None:
-                features.append(feature)
+        # Files that fail to parse as UTF-8 are retried as latin-1, unless they declare another encoding
+        encodings = [None]
+        match = xml_encoding_pattern.search(head.lower())
+        if not match or match.group(1).replace(b'_', b'-') in (b'utf-8', b'utf8'):
+            encodings.append('iso-8859-1')
+        
+        parse_error = None
+        for encoding in encodings:
+            try:
+                return kml_placemarks_to_features(kml_path, shared_properties, encoding)
+            except (ET.ParseError, UnicodeDecodeError) as e:
+                # Malformed or truncated files yield no features rather than the placemarks before the error
+                parse_error = parse_error or e
+        print(f"Error parsing KML {kml_path}: {parse_error}")
         
-    except ET.ParseError as e:
-        print(f"Error parsing KML {kml_path}: {e}")
     except Exception as e:
         print(f"Unexpected error processing KML {kml_path}: {e}")
     
-    return features
+    return []
+
+def convert_project_kmls(project: Tuple[Dict[str, Any], List[Path]]) -> List[bytes]:
+    """Convert one project's downloaded KML files to serialized GeoJSON features"""
+    row, kml_paths = project
+    encoded_features = []
+    
+    for kml_path in kml_paths:
+        # Placemarks sharing one properties dict only have it serialized once
+        encoded_properties = {}
+        
+        # Convert KML to GeoJSON features
+        for feature in kml_to_geojson_feature(kml_path, row):
+            properties_id = id(feature["properties"])
+            if properties_id not in encoded_properties:
+                encoded_properties[properties_id] = encode_json(feature["properties"])
+            encoded_features.append(encode_feature(feature, encoded_properties[properties_id]))
+    
+    return encoded_features
+
+# Bump when feature conversion changes so cached results are not reused
+feature_cache_version = 7
+
+def project_cache_key(row: Dict[str, Any], kml_paths: List[Path]) -> Optional[str]:
+    """Key a project's converted features on the parser, its CSV row and the size and mtime of each downloaded KML file
+    
+    Returns None, so the project is converted without the cache, if a KML file can no longer be read.
+    """
+    parts = [str(feature_cache_version), kml_parser, json.dumps(list(row.items()), ensure_ascii=False)]
+    for kml_path in kml_paths:
+        try:
+            st = kml_path.stat()
+        except OSError:
+            return None
+        parts.append(f"{kml_path}:{st.st_mtime_ns}:{st.st_size}")
+    return hashlib.blake2b('\n'.join(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+def open_feature_cache(cache_path: Path) -> sqlite3.Connection:
+    """Open the on-disk cache of converted project features
+    
+    Each row holds a project's serialized GeoJSON features, one per line.
+    """
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    cache = sqlite3.connect(cache_path)
+    cache.execute("CREATE TABLE IF NOT EXISTS features (key TEXT PRIMARY KEY, features BLOB)")
+    return cache
+
+def index_kml_files(kml_dir: Path) -> set:
+    """Paths of all KML files under kml_dir, as strings, from a single directory walk"""
+    return {os.path.join(dirpath, filename)
+            for dirpath, _, filenames in os.walk(kml_dir)
+            for filename in filenames if filename.endswith('.kml')}
 
 def process_csv_to_geojson(csv_path: str, output_path: str = "geojsonoutput.geojson", state: str = ""):
     """Main function to process CSV and create GeoJSON by batch downloading KML files"""
@@ -258,7 +489,8 @@ def process_csv_to_geojson(csv_path: str, output_path: str = "geojsonoutput.geoj
     url_file_path = f"kml_urls_{state}.txt" if state else "kml_urls_all.txt"
     
     print("Generating KML URL list for batch downloading...")
-    url_count = generate_kml_url_file(csv_path, url_file_path, kml_dir)
+    rows, total_projects = generate_kml_url_file(csv_path, url_file_path, kml_dir)
+    url_count = sum(len(kml_paths) for *_, kml_paths in rows)
     print(f"Generated {url_count} KML URLs")
     
     if url_count == 0:
@@ -280,63 +512,74 @@ def process_csv_to_geojson(csv_path: str, output_path: str = "geojsonoutput.geoj
     
     # Process downloaded KML files into GeoJSON
     print("\nProcessing KML files to GeoJSON...")
-    all_features = []
+    feature_count = 0
     
-    # Read CSV file again to process each row
-    with open(csv_path, 'r', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        rows = list(reader)
-        total_projects = len(rows)
-        processed_count = 0
+    processed_count = 0
+    
+    # Index the downloaded KML files once instead of checking each path
+    existing_kmls = index_kml_files(kml_dir)
+    projects = []
+    # Reuse the rows and KML paths collected while generating the URL file
+    for row_idx, row, kml_paths in rows:
+        downloaded = [kml_path for kml_path in kml_paths if str(kml_path) in existing_kmls]
+        missing = [kml_path for kml_path in kml_paths if str(kml_path) not in existing_kmls]
+        projects.append((row_idx, len(kml_paths), missing, (row, downloaded)))
+    
+    # Projects whose CSV row and KML files are unchanged since the last run are read from the cache
+    cache = open_feature_cache(kml_dir / "features_cache.sqlite")
+    cache_keys = [project_cache_key(*project) for *_, project in projects]
+    cache.execute("CREATE TEMP TABLE current_keys (key TEXT PRIMARY KEY)")
+    cache.executemany("INSERT OR IGNORE INTO current_keys VALUES (?)", ((key,) for key in cache_keys if key is not None))
+    cached_keys = {key for key, in cache.execute("SELECT key FROM features WHERE key IN (SELECT key FROM current_keys)")}
+    pending_inserts = []
+    print(f"Reusing cached features for {len(cached_keys)} of {len(projects)} projects")
+    
+    # Convert projects across processes and write features in CSV order as results arrive, one per line
+    with open(output_path, 'wb') as f, ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        f.write(b'{"type": "FeatureCollection", "features": [\n')
         
-        for row_idx, row in enumerate(rows, 1):
+        misses = [project for (*_, project), key in zip(projects, cache_keys) if key not in cached_keys]
+        results = executor.map(convert_project_kmls, misses, chunksize=32)
+        for (row_idx, kml_count, missing_paths, (row, _)), key in zip(projects, cache_keys):
+            if key in cached_keys:
+                # Serialized features never contain a raw newline, so one per line splits back exactly
+                cached = cache.execute("SELECT features FROM features WHERE key = ?", (key,)).fetchone()[0]
+                encoded_features = cached.split(b'\n') if cached else []
+            else:
+                encoded_features = next(results)
+                if key is not None:
+                    pending_inserts.append((key, b'\n'.join(encoded_features)))
+                if len(pending_inserts) >= 256:
+                    with cache:
+                        cache.executemany("INSERT OR REPLACE INTO features VALUES (?, ?)", pending_inserts)
+                    pending_inserts.clear()
+            
             proposal_id = row.get('Proposal Number', '')
             project_id = row.get('ID', '')
-            kml_urls_str = row.get('KML URLs', '')
-            
-            if not kml_urls_str:
-                continue
-                
-            # Parse multiple URLs separated by semicolon
-            kml_urls = [url.strip() for url in kml_urls_str.split(';') if url.strip()]
             
-            if not kml_urls:
-                continue
+            print(f"Processing {proposal_id} (ID: {project_id}) ({row_idx}/{total_projects}) with {kml_count} KML file(s)")
+            for kml_path in missing_paths:
+                print(f"  Warning: KML file not found: {kml_path}")
             
-            print(f"Processing {proposal_id} (ID: {project_id}) ({row_idx}/{total_projects}) with {len(kml_urls)} KML file(s)")
+            for encoded_feature in encoded_features:
+                if feature_count:
+                    f.write(b',\n')
+                f.write(encoded_feature)
+                feature_count += 1
             
-            # Process each KML file for this project
-            project_has_features = False
-            for url in kml_urls:
-                # Generate the expected file path
-                filename = generate_kml_filename(url)
-                kml_path = kml_dir / project_id / filename
-                
-                if kml_path.exists():
-                    # Convert KML to GeoJSON features
-                    features = kml_to_geojson_feature(kml_path, row)
-                    if features:
-                        all_features.extend(features)
-                        project_has_features = True
-                else:
-                    print(f"  Warning: KML file not found: {kml_path}")
-            
-            if project_has_features:
+            if encoded_features:
                 processed_count += 1
+        
+        f.write(b'\n]}\n')
     
-    print(f"Processed {processed_count} projects with valid geometry")
-    
-    # Create GeoJSON
-    geojson = {
-        "type": "FeatureCollection",
-        "features": all_features
-    }
-    
-    # Write GeoJSON file
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(geojson, f, indent=2, ensure_ascii=False)
+    with cache:
+        cache.executemany("INSERT OR REPLACE INTO features VALUES (?, ?)", pending_inserts)
+        # Drop entries for projects no longer in the CSV and for superseded rows or KML files
+        cache.execute("DELETE FROM features WHERE key NOT IN (SELECT key FROM current_keys)")
+    cache.close()
     
-    print(f"Created {output_path} with {len(all_features)} features")
+    print(f"Processed {processed_count} projects with valid geometry")
+    print(f"Created {output_path} with {feature_count} features")
 
 def main():
     """Main entry point"""
@@ -6,10 +6,44 @@
 import os
 import sys
 import glob
+import re
+import json
+import itertools
 from pathlib import Path
-import pandas as pd
-import geopandas as gpd
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Check that geopandas and its Arrow-based reader are available before anything uses them
+try:
+    import numpy as np
+    import pandas as pd
+    import geopandas as gpd
+    import pyogrio
+    import pyarrow
+    import shapely
+except ImportError as e:
+    print("Error: Required packages not found.")
+    print("Please install required packages:")
+    print("  pip install geopandas pandas pyogrio pyarrow shapely numpy")
+    print(f"Missing: {e}")
+    sys.exit(1)
+
+try:
+    import ijson
+    json_errors = (json.JSONDecodeError, ijson.JSONError)
+except ImportError:
+    ijson = None
+    json_errors = (json.JSONDecodeError,)
+
+# Geometry type names indexed by shapely.get_type_id
+geometry_type_names = ["Point", "LineString", "LinearRing", "Polygon", "MultiPoint",
+                       "MultiLineString", "MultiPolygon", "GeometryCollection"]
+
+# Number of features parsed and validated together in the fallback path
+feature_batch_size = 10000
+
+# Per-state files produced by 4_make_shape.py, capturing the state code
+projects_file_pattern = re.compile(r'Projects_(.*)\.geojson$')
 
 def find_geojson_files(geojson_dir: str = "geojson") -> List[str]:
     """Find all GeoJSON files in the specified directory"""
@@ -17,177 +51,167 @@ def find_geojson_files(geojson_dir: str = "geojson") -> List[str]:
     geojson_files = glob.glob(geojson_pattern)
     return sorted(geojson_files)
 
-def combine_geojson_to_gpkg(geojson_files: List[str], output_path: str = "india-environmental-approvals.gpkg"):
-    """Combine multiple GeoJSON files into a single GeoPackage"""
+def read_geojson(path: str) -> gpd.GeoDataFrame:
+    """Read a GeoJSON file through pyogrio's Arrow interface"""
+    # Keep date fields as datetime64 rather than Arrow's default of Python date objects
+    return gpd.read_file(path, engine="pyogrio", use_arrow=True,
+                         arrow_to_pandas_kwargs={"date_as_object": False})
+
+def iter_features(f) -> Iterator[Dict[str, Any]]:
+    """Yield the features of a GeoJSON FeatureCollection, streaming them with ijson when available"""
+    if ijson is not None:
+        yield from ijson.items(f, 'features.item', use_float=True)
+    else:
+        yield from json.load(f).get('features', [])
+
+def constant_category(value: str, length: int) -> pd.Categorical:
+    """A categorical column repeating one value, stored as a single category and integer codes"""
+    return pd.Categorical.from_codes(np.zeros(length, dtype=np.int8), categories=[value])
+
+def add_source_columns(gdf: gpd.GeoDataFrame, geojson_file: str):
+    """Tag features with their source file and, for Projects_XX.geojson files, the state code"""
+    source_filename = os.path.basename(geojson_file)
+    gdf['source_file'] = constant_category(source_filename, len(gdf))
     
-    if not geojson_files:
-        print("No GeoJSON files found to combine.")
-        return
+    # Extract state code from filename if it follows the pattern Projects_XX.geojson
+    match = projects_file_pattern.match(source_filename)
+    if match:
+        gdf['state_code'] = constant_category(match.group(1), len(gdf))
+
+def parse_valid_geometries(geometry_json: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Parse GeoJSON geometry strings with GEOS, returning the geometries and a mask of the valid, non-empty ones"""
+    # Unparseable geometries come back as None, which shapely treats as invalid
+    geometries = shapely.from_geojson(geometry_json, on_invalid='ignore')
+    return geometries, shapely.is_valid(geometries) & ~shapely.is_empty(geometries)
+
+def read_geojson_file(geojson_file: str, validate: bool = True) -> Tuple[Optional[gpd.GeoDataFrame], List[str]]:
+    """Read and clean one GeoJSON file, returning its valid features and progress messages
     
-    print(f"Found {len(geojson_files)} GeoJSON files to combine:")
-    for geojson_file in geojson_files:
-        print(f"  - {geojson_file}")
+    Messages are returned rather than printed so files read in parallel still
+    report in order. With validate=False, features read by pyogrio are kept
+    without checking their geometries.
+    """
+    messages = []
+    log = messages.append
     
-    combined_gdfs = []
-    total_features = 0
-    
-    for geojson_file in geojson_files:
+    try:
+        log(f"Reading {geojson_file}...")
+        # Try to read with GeoPandas first
         try:
-            print(f"Reading {geojson_file}...")
-            # Try to read with GeoPandas first
-            try:
-                gdf = gpd.read_file(geojson_file)
-                
-                if not gdf.empty:
+            gdf = read_geojson(geojson_file)
+            
+            # GeoJSON is WGS84; give every frame the same CRS up front so concat has nothing to reconcile
+            if gdf.crs is None:
+                gdf = gdf.set_crs('EPSG:4326')
+                log("  Set CRS to WGS84 (EPSG:4326)")
+            
+            if not gdf.empty:
+                if validate:
                     # Validate and clean geometries
                     initial_count = len(gdf)
                     
-                    # Remove invalid geometries
-                    gdf = gdf[gdf.geometry.is_valid & ~gdf.geometry.is_empty]
-                    
-                    # Remove rows with null geometries
-                    gdf = gdf[gdf.geometry.notnull()]
+                    # Remove invalid, empty and null geometries in one vectorized pass
+                    # (shapely treats missing geometries as invalid)
+                    geometries = np.asarray(gdf.geometry.values)
+                    gdf = gdf[shapely.is_valid(geometries) & ~shapely.is_empty(geometries)]
                     
                     if len(gdf) < initial_count:
                         invalid_count = initial_count - len(gdf)
-                        print(f"  Warning: Removed {invalid_count} invalid/empty geometries")
+                        log(f"  Warning: Removed {invalid_count} invalid/empty geometries")
+                
+                if not gdf.empty:
+                    # Add source file information
+                    add_source_columns(gdf, geojson_file)
                     
-                    if not gdf.empty:
-                        # Add source file information
-                        source_filename = os.path.basename(geojson_file)
-                        gdf['source_file'] = source_filename
-                        
-                        # Extract state code from filename if it follows the pattern Projects_XX.geojson
-                        if source_filename.startswith('Projects_') and source_filename.endswith('.geojson'):
-                            state_code = source_filename.replace('Projects_', '').replace('.geojson', '')
-                            gdf['state_code'] = state_code
-                        
-                        combined_gdfs.append(gdf)
-                        feature_count = len(gdf)
-                        total_features += feature_count
-                        print(f"  Added {feature_count} valid features from {geojson_file}")
-                    else:
-                        print(f"  Warning: No valid geometries found in {geojson_file}, skipping")
+                    log(f"  Added {len(gdf)} valid features from {geojson_file}")
+                    return gdf, messages
                 else:
-                    print(f"  Warning: {geojson_file} is empty, skipping")
-                    
-            except Exception as geopandas_error:
-                print(f"  GeoPandas error reading {geojson_file}: {geopandas_error}")
-                print(f"  Attempting to process with geometry validation...")
+                    log(f"  Warning: No valid geometries found in {geojson_file}, skipping")
+            else:
+                log(f"  Warning: {geojson_file} is empty, skipping")
                 
-                # Try to read as raw JSON and validate manually
-                try:
-                    import json
-                    with open(geojson_file, 'r') as f:
-                        geojson_data = json.load(f)
-                    
-                    # Validate and clean features
-                    valid_features = []
-                    invalid_count = 0
-                    
-                    for feature in geojson_data.get('features', []):
-                        geometry = feature.get('geometry', {})
-                        geom_type = geometry.get('type')
-                        coordinates = geometry.get('coordinates', [])
-                        
-                        # Basic validation for common geometry types
-                        is_valid = False
-                        try:
-                            if geom_type == 'Point' and isinstance(coordinates, list) and len(coordinates) == 2:
-                                # Ensure coordinates are valid numbers
-                                if all(isinstance(coord, (int, float)) for coord in coordinates):
-                                    is_valid = True
-                            elif geom_type == 'LineString' and isinstance(coordinates, list) and len(coordinates) >= 2:
-                                # Ensure all coordinates are valid point arrays
-                                if all(isinstance(point, list) and len(point) == 2 and 
-                                      all(isinstance(coord, (int, float)) for coord in point) for point in coordinates):
-                                    is_valid = True
-                            elif geom_type == 'Polygon' and isinstance(coordinates, list) and len(coordinates) >= 1:
-                                # Check if outer ring has at least 4 coordinates and all are valid
-                                if (isinstance(coordinates[0], list) and len(coordinates[0]) >= 4 and
-                                    all(isinstance(point, list) and len(point) == 2 and 
-                                        all(isinstance(coord, (int, float)) for coord in point) for point in coordinates[0])):
-                                    is_valid = True
-                            elif geom_type == 'MultiPoint' and isinstance(coordinates, list) and len(coordinates) > 0:
-                                # Validate each point in the MultiPoint
-                                if all(isinstance(point, list) and len(point) == 2 and 
-                                      all(isinstance(coord, (int, float)) for coord in point) for point in coordinates):
-                                    is_valid = True
-                            elif geom_type == 'MultiLineString' and isinstance(coordinates, list) and len(coordinates) > 0:
-                                # Validate each LineString in the MultiLineString
-                                if all(isinstance(line, list) and len(line) >= 2 and
-                                      all(isinstance(point, list) and len(point) == 2 and 
-                                          all(isinstance(coord, (int, float)) for coord in point) for point in line) 
-                                      for line in coordinates):
-                                    is_valid = True
-                            elif geom_type == 'MultiPolygon' and isinstance(coordinates, list) and len(coordinates) > 0:
-                                # Validate each Polygon in the MultiPolygon (basic check)
-                                if all(isinstance(polygon, list) and len(polygon) >= 1 for polygon in coordinates):
-                                    is_valid = True
-                        except (TypeError, IndexError, ValueError):
-                            # If any error occurs during validation, mark as invalid
-                            is_valid = False
+        except Exception as geopandas_error:
+            log(f"  GeoPandas error reading {geojson_file}: {geopandas_error}")
+            log(f"  Attempting to process with geometry validation...")
+            
+            # Try to read as raw JSON and validate manually
+            try:
+                valid_properties = []
+                valid_geometries = []
+                invalid_count = 0
+                
+                # Stream features and validate them in batches instead of holding the whole document
+                with open(geojson_file, 'rb') as f:
+                    features = iter_features(f)
+                    while True:
+                        batch = list(itertools.islice(features, feature_batch_size))
+                        if not batch:
+                            break
                         
-                        if is_valid:
-                            valid_features.append(feature)
-                        else:
-                            invalid_count += 1
+                        geometries, valid_mask = parse_valid_geometries([json.dumps(feature.get('geometry')) for feature in batch])
+                        valid_geometries.append(geometries[valid_mask])
+                        valid_properties.extend(batch[i].get('properties') or {} for i in np.flatnonzero(valid_mask))
+                        invalid_count += len(batch) - int(valid_mask.sum())
+                
+                valid_count = len(valid_properties)
+                
+                if valid_count:
+                    log(f"  Found {valid_count} valid features after manual validation")
+                    if invalid_count > 0:
+                        log(f"  Removed {invalid_count} invalid geometries")
                     
-                    if valid_features:
-                        print(f"  Found {len(valid_features)} valid features after manual validation")
-                        if invalid_count > 0:
-                            print(f"  Removed {invalid_count} invalid geometries")
-                        
-                        # Create a new GeoJSON structure with valid features
-                        cleaned_geojson = {
-                            "type": "FeatureCollection",
-                            "features": valid_features
-                        }
+                    # Build the GeoDataFrame directly from the valid features
+                    try:
+                        gdf = gpd.GeoDataFrame(pd.DataFrame(valid_properties), geometry=np.concatenate(valid_geometries), crs="EPSG:4326")
                         
-                        # Write to a temporary file and read with GeoPandas
-                        temp_file = geojson_file + '.temp'
-                        with open(temp_file, 'w') as f:
-                            json.dump(cleaned_geojson, f)
-                        
-                        try:
-                            gdf = gpd.read_file(temp_file)
-                            os.remove(temp_file)  # Clean up temp file
+                        if not gdf.empty:
+                            # Add source file information
+                            add_source_columns(gdf, geojson_file)
                             
-                            if not gdf.empty:
-                                # Add source file information
-                                source_filename = os.path.basename(geojson_file)
-                                gdf['source_file'] = source_filename
-                                
-                                # Extract state code from filename if it follows the pattern Projects_XX.geojson
-                                if source_filename.startswith('Projects_') and source_filename.endswith('.geojson'):
-                                    state_code = source_filename.replace('Projects_', '').replace('.geojson', '')
-                                    gdf['state_code'] = state_code
-                                
-                                combined_gdfs.append(gdf)
-                                feature_count = len(gdf)
-                                total_features += feature_count
-                                print(f"  Added {feature_count} features after cleaning from {geojson_file}")
-                            else:
-                                print(f"  Warning: No valid features after cleaning {geojson_file}")
-                                
-                        except Exception as temp_error:
-                            print(f"  Error reading cleaned temporary file: {temp_error}")
-                            if os.path.exists(temp_file):
-                                os.remove(temp_file)
-                            continue
-                    else:
-                        print(f"  No valid features found in {geojson_file}")
-                        
-                except json.JSONDecodeError as json_error:
-                    print(f"  JSON parsing error: {json_error}")
-                    continue
-                except Exception as manual_error:
-                    print(f"  Manual validation error: {manual_error}")
-                    continue
-                
-        except Exception as e:
-            print(f"  Unexpected error reading {geojson_file}: {e}")
-            continue
+                            log(f"  Added {len(gdf)} features after cleaning from {geojson_file}")
+                            return gdf, messages
+                        else:
+                            log(f"  Warning: No valid features after cleaning {geojson_file}")
+                            
+                    except Exception as features_error:
+                        log(f"  Error building GeoDataFrame from cleaned features: {features_error}")
+                        return None, messages
+                else:
+                    log(f"  No valid features found in {geojson_file}")
+                    
+            except json_errors as json_error:
+                log(f"  JSON parsing error: {json_error}")
+                return None, messages
+            except Exception as manual_error:
+                log(f"  Manual validation error: {manual_error}")
+                return None, messages
+            
+    except Exception as e:
+        log(f"  Unexpected error reading {geojson_file}: {e}")
+        return None, messages
+    
+    return None, messages
+
+def combine_geojson_to_gpkg(geojson_files: List[str], output_path: str = "india-environmental-approvals.gpkg", validate: bool = True):
+    """Combine multiple GeoJSON files into a single GeoPackage"""
+    
+    if not geojson_files:
+        print("No GeoJSON files found to combine.")
+        return
+    
+    print(f"Found {len(geojson_files)} GeoJSON files to combine:")
+    for geojson_file in geojson_files:
+        print(f"  - {geojson_file}")
+    
+    combined_gdfs = []
+    
+    # Read files in parallel, printing each file's messages in the original order
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for gdf, messages in executor.map(read_geojson_file, geojson_files, itertools.repeat(validate)):
+            for message in messages:
+                print(message)
+            if gdf is not None:
+                combined_gdfs.append(gdf)
     
     if not combined_gdfs:
         print("No valid GeoJSON data found to combine.")
@@ -199,10 +223,10 @@ def combine_geojson_to_gpkg(geojson_files: List[str], output_path: str = "india-
     try:
         combined_gdf = gpd.GeoDataFrame(pd.concat(combined_gdfs, ignore_index=True))
         
-        # Ensure the CRS is set (default to WGS84 if not specified)
-        if combined_gdf.crs is None:
-            combined_gdf.set_crs('EPSG:4326', inplace=True)
-            print("Set CRS to WGS84 (EPSG:4326)")
+        # Per-file categories don't survive concat; rebuild one shared dictionary per column
+        for column in ('source_file', 'state_code'):
+            if column in combined_gdf.columns:
+                combined_gdf[column] = combined_gdf[column].astype('category')
         
         print(f"Combined dataset has {len(combined_gdf)} total features")
         print(f"CRS: {combined_gdf.crs}")
@@ -210,7 +234,15 @@ def combine_geojson_to_gpkg(geojson_files: List[str], output_path: str = "india-
         
         # Write to GeoPackage
         print(f"\nWriting to {output_path}...")
-        combined_gdf.to_file(output_path, driver='GPKG')
+        # Hand GDAL Arrow record batches; the GPKG driver builds the spatial index once when the layer is closed
+        try:
+            pyogrio.write_dataframe(combined_gdf, output_path, driver='GPKG', use_arrow=True)
+        except Exception as arrow_error:
+            # The Arrow writer needs pyogrio >= 0.8 and GDAL >= 3.8; fall back to the row-based writer
+            print(f"Arrow write unavailable ({arrow_error}), writing without Arrow...")
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            pyogrio.write_dataframe(combined_gdf, output_path, driver='GPKG')
         
         print(f"Successfully created {output_path}")
         print(f"Total features: {len(combined_gdf)}")
@@ -223,10 +255,13 @@ def combine_geojson_to_gpkg(geojson_files: List[str], output_path: str = "india-
                 print(f"  State {state}: {count} features")
         
         # Print geometry type distribution
-        geom_types = combined_gdf.geometry.geom_type.value_counts()
+        # Histogram of GEOS type ids; missing geometries (-1) are not counted
+        type_ids = shapely.get_type_id(np.asarray(combined_gdf.geometry.values))
+        type_counts = np.bincount(type_ids[type_ids >= 0], minlength=len(geometry_type_names))
         print(f"\nGeometry types:")
-        for geom_type, count in geom_types.items():
-            print(f"  {geom_type}: {count}")
+        for type_id in np.argsort(-type_counts, kind='stable'):
+            if type_counts[type_id]:
+                print(f"  {geometry_type_names[type_id]}: {type_counts[type_id]}")
             
     except Exception as e:
         print(f"Error combining GeoDataFrames: {e}")
@@ -235,24 +270,15 @@ def combine_geojson_to_gpkg(geojson_files: List[str], output_path: str = "india-
 def main():
     """Main entry point"""
     
-    # Check if geopandas is available
-    try:
-        import geopandas as gpd
-        import pandas as pd
-    except ImportError as e:
-        print("Error: Required packages not found.")
-        print("Please install required packages:")
-        print("  pip install geopandas pandas")
-        print(f"Missing: {e}")
-        sys.exit(1)
-    
     # Set up paths
     geojson_dir = "geojson"
     output_path = "india-environmental-approvals.gpkg"
     
-    # Allow custom output path as command line argument
-    if len(sys.argv) > 1:
-        output_path = sys.argv[1]
+    # Allow custom output path as command line argument; --no-validate skips the geometry checks
+    args = [arg for arg in sys.argv[1:] if arg != '--no-validate']
+    validate = len(args) == len(sys.argv) - 1
+    if args:
+        output_path = args[0]
     
     print("Parivesh GeoJSON to GeoPackage Combiner")
     print("=" * 40)
@@ -275,7 +301,7 @@ def main():
         sys.exit(1)
     
     # Combine files
-    combine_geojson_to_gpkg(geojson_files, output_path)
+    combine_geojson_to_gpkg(geojson_files, output_path, validate)
 
 if __name__ == "__main__":
     main()
@@ -7,19 +7,68 @@ Supports different content types (JSON, KML, etc.) with appropriate validation.
 
 import asyncio
 import aiohttp
-import json
 import os
 import sys
 import random
 import argparse
 import ssl
 from pathlib import Path
-from typing import List, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple, Optional
 import time
 from datetime import datetime
 
+# orjson validates and parses JSON considerably faster; fall back to stdlib json
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# uvloop runs the event loop on libuv; fall back to the default asyncio loop
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# KML files are recognised by a <kml or <placemark tag within this many leading bytes
+kml_sniff_bytes = 8192
+
+# Rate limiting and temporary unavailability are retried, with exponential backoff
+retry_statuses = {429, 503}
+max_attempts = 5
+max_retry_delay = 60.0
+# Cap on the total time one download spends backing off
+max_total_retry_delay = 120.0
+# Request errors worth retrying: connection drops, truncated bodies and timeouts
+retry_errors = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError)
+
+# SSL context that doesn't verify certificates (like curl without --cacert), built once and
+# shared by every connection. Only HTTP/1.1 is offered over ALPN, which is all aiohttp speaks.
+ssl_context = ssl.create_default_context()
+ssl_context.check_hostname = False
+ssl_context.verify_mode = ssl.CERT_NONE
+ssl_context.set_alpn_protocols(['http/1.1'])
+
+def retry_delay(retry_after: Optional[str], attempt: int) -> float:
+    """Seconds to wait before retrying: the server's Retry-After if given in seconds, else exponential backoff with jitter"""
+    try:
+        delay = float(retry_after)
+    except (TypeError, ValueError):
+        delay = 2 ** attempt + random.random()
+    return min(max(delay, 0.0), max_retry_delay)
+
+def is_kml(head: bytes) -> bool:
+    """Check the leading bytes of a file for a KML root or Placemark tag"""
+    lowered = head.lower()
+    return b'<kml' in lowered or b'<placemark' in lowered
+
 class ParallelDownloader:
-    def __init__(self, min_batch_size=5, max_batch_size=20, min_delay=1.0, max_delay=5.0, max_concurrent=10, content_type='json', http_method='POST', timestamp_file=None):
+    def __init__(self, min_batch_size=5, max_batch_size=20, min_delay=1.0, max_delay=5.0, max_concurrent=10, content_type='json', http_method='POST', timestamp_file=None, skip_content_validation=False, skip_download_validation=False):
         self.min_batch_size = min_batch_size
         self.max_batch_size = max_batch_size
         self.min_delay = min_delay
@@ -29,6 +78,10 @@ class ParallelDownloader:
         self.http_method = http_method.upper()
         self.semaphore = asyncio.Semaphore(max_concurrent)
         self.timestamp_file = timestamp_file
+        # Treat any existing non-empty file as valid without reading it
+        self.skip_content_validation = skip_content_validation
+        # Accept any non-empty 200 response without parsing or sniffing it
+        self.skip_download_validation = skip_download_validation
         self.timestamps_data = {}
         
         # Load timestamp data if provided
@@ -44,17 +97,24 @@ class ParallelDownloader:
     def _load_timestamps(self):
         """Load timestamp data from JSON file"""
         try:
-            with open(self.timestamp_file, 'r') as f:
-                data = json.load(f)
+            with open(self.timestamp_file, 'rb') as f:
+                # Stream the search results with ijson when available instead of loading the whole document
+                if ijson is not None:
+                    items = ijson.items(f, 'data.item', use_float=True)
+                else:
+                    items = _json.loads(f.read()).get('data', [])
                 # Extract timestamps for each proposal ID
-                for item in data.get('data', []):
+                for item in items:
                     if item.get('id') and item.get('app_updated_on'):
                         self.timestamps_data[str(item['id'])] = item['app_updated_on']
         except Exception as e:
             print(f"Warning: Could not load timestamps from {self.timestamp_file}: {e}")
     
-    def _should_redownload_file(self, output_path: str) -> bool:
-        """Check if file should be re-downloaded based on timestamp comparison"""
+    def _should_redownload_file(self, output_path: str, existing_data: Any = None) -> bool:
+        """Check if file should be re-downloaded based on timestamp comparison
+        
+        existing_data is the already parsed content of output_path, if the caller has it.
+        """
         if not self.timestamps_data:
             return False
             
@@ -70,10 +130,11 @@ class ParallelDownloader:
             current_timestamp = self.timestamps_data[proposal_id]
             
             # Try to get timestamp from existing file
-            if os.path.exists(output_path):
-                with open(output_path, 'r') as f:
-                    existing_data = json.load(f)
-                    
+            if existing_data is None and os.path.exists(output_path):
+                with open(output_path, 'rb') as f:
+                    existing_data = _json.loads(f.read())
+            
+            if existing_data is not None:
                 # Check various possible timestamp fields in the existing file
                 existing_timestamp = None
                 for field in ['app_updated_on', 'Application Updated On', 'updated_on']:
@@ -132,94 +193,179 @@ class ParallelDownloader:
     def validate_file_content(self, file_path: str) -> bool:
         """Validate file content based on content type"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
+            with open(file_path, 'rb') as f:
+                if self.content_type == 'kml':
+                    # Basic KML validation - check for KML tags near the start of the file
+                    return is_kml(f.read(kml_sniff_bytes))
                 content = f.read()
             
             if self.content_type == 'json':
-                json.loads(content)
+                _json.loads(content)
                 return True
-            elif self.content_type == 'kml':
-                # Basic KML validation - check for KML tags
-                return '<kml' in content.lower() or '<placemark' in content.lower()
             else:
                 # For other content types, just check if file has content
                 return len(content.strip()) > 0
                 
-        except (json.JSONDecodeError, IOError, UnicodeDecodeError):
+        except (_json.JSONDecodeError, IOError, UnicodeDecodeError):
             return False
     
+    def _existing_file_sizes(self, output_paths: List[str]) -> Dict[str, Dict[str, int]]:
+        """Map each output directory to the sizes of the requested files already in it, listing every directory once"""
+        wanted = {}
+        for output_path in output_paths:
+            wanted.setdefault(os.path.dirname(output_path), set()).add(os.path.basename(output_path))
+        
+        sizes = {}
+        for output_dir, names in wanted.items():
+            dir_sizes = sizes[output_dir] = {}
+            try:
+                with os.scandir(output_dir or '.') as entries:
+                    for entry in entries:
+                        # DirEntry.stat() is a syscall on POSIX, so only stat the files asked about
+                        if entry.name not in names:
+                            continue
+                        try:
+                            dir_sizes[entry.name] = entry.stat().st_size
+                        except OSError:
+                            pass
+            except OSError:
+                pass  # Directory doesn't exist yet
+        return sizes
+    
+    def _load_json_file(self, file_path: str) -> Tuple[bool, Any]:
+        """Read and parse a JSON file, returning whether it is valid and its content"""
+        try:
+            with open(file_path, 'rb') as f:
+                return True, _json.loads(f.read())
+        except (_json.JSONDecodeError, IOError, UnicodeDecodeError):
+            return False, None
+    
+    def _check_existing_file(self, output_path: str, file_exists: bool) -> Tuple[bool, bool]:
+        """Return whether an existing file can be kept and whether it must be re-downloaded due to a timestamp update"""
+        if file_exists and self.timestamps_data and self.content_type == 'json' and not self.skip_content_validation:
+            # Read and parse the file once for both the validity and the timestamp check
+            valid, existing_data = self._load_json_file(output_path)
+            should_redownload = valid and self._should_redownload_file(output_path, existing_data)
+            return valid and not should_redownload, should_redownload
+        
+        # Check if file should be re-downloaded due to timestamp update
+        should_redownload = self._should_redownload_file(output_path)
+        
+        keep = file_exists and not should_redownload and (self.skip_content_validation or self.validate_file_content(output_path))
+        return keep, file_exists and should_redownload
+    
     def filter_existing_files(self, urls_and_paths: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
         """Filter out URLs where output files already exist and are valid, considering timestamps"""
         filtered = []
+        output_paths = [output_path for _, output_path in urls_and_paths]
+        existing_sizes = self._existing_file_sizes(output_paths)
+        files_exist = [existing_sizes[os.path.dirname(output_path)].get(os.path.basename(output_path), 0) > 0
+                       for output_path in output_paths]
         
-        for url, output_path in urls_and_paths:
-            file_exists = os.path.exists(output_path) and os.path.getsize(output_path) > 0
-            
-            # Check if file should be re-downloaded due to timestamp update
-            should_redownload = self._should_redownload_file(output_path)
-            
-            if file_exists and self.validate_file_content(output_path) and not should_redownload:
+        # Reading and validating existing files is mostly I/O, so check them from a thread pool
+        with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+            checks = list(executor.map(self._check_existing_file, output_paths, files_exist))
+        
+        for (url, output_path), (keep, should_redownload) in zip(urls_and_paths, checks):
+            if keep:
                 self.skipped += 1
                 continue
-            elif file_exists and should_redownload:
+            elif should_redownload:
                 self.force_redownloaded += 1
             
             filtered.append((url, output_path))
         
         return filtered
     
-    async def download_single(self, session: aiohttp.ClientSession, url: str, output_path: str) -> bool:
-        """Download a single file with retry logic"""
-        async with self.semaphore:
-            temp_path = f"{output_path}.tmp"
-            
+    @staticmethod
+    def _write_file(temp_path: str, output_path: str, content: bytes):
+        """Write content to a temp file and move it into place"""
+        with open(temp_path, 'wb') as f:
+            f.write(content)
+        
+        os.rename(temp_path, output_path)
+    
+    async def fetch(self, request_method: Callable, url: str) -> Optional[bytes]:
+        """Fetch and validate a URL's content with retry logic, returning None on failure
+        
+        request_method is the session's post or get method, chosen once per run.
+        Each attempt holds a concurrency slot only while its request is in flight,
+        so downloads backing off don't block the others.
+        """
+        total_delay = 0.0
+        for attempt in range(max_attempts):
+            retry_after = None
             try:
-                # Ensure output directory exists
-                output_dir = os.path.dirname(output_path)
-                if output_dir:  # Only create if there's actually a directory part
-                    os.makedirs(output_dir, exist_ok=True)
-                
-                # Use appropriate HTTP method
-                request_method = session.post if self.http_method == 'POST' else session.get
-                async with request_method(url) as response:
+                async with self.semaphore, request_method(url) as response:
                     if response.status == 200:
-                        content = await response.text()
+                        # Keep the body as bytes; it is validated and written without decoding
+                        content = await response.read()
                         
                         # Validate content based on content type
-                        if self.content_type == 'json':
+                        if self.skip_download_validation:
+                            if not content:
+                                print(f"Warning: Empty response from {url}")
+                                return None
+                        elif self.content_type == 'json':
                             try:
-                                json.loads(content)
-                            except json.JSONDecodeError:
+                                _json.loads(content)
+                            except (_json.JSONDecodeError, UnicodeDecodeError):
                                 print(f"Warning: Invalid JSON from {url}")
-                                return False
+                                return None
                         elif self.content_type == 'kml':
-                            if not ('<kml' in content.lower() or '<placemark' in content.lower()):
+                            if not is_kml(content[:kml_sniff_bytes]):
                                 print(f"Warning: Invalid KML content from {url}")
-                                return False
+                                return None
                         
-                        # Write to temp file first, then move
-                        with open(temp_path, 'w') as f:
-                            f.write(content)
-                        
-                        os.rename(temp_path, output_path)
-                        self.downloaded += 1
-                        return True
+                        return content
+                    elif response.status in retry_statuses and attempt + 1 < max_attempts:
+                        retry_after = response.headers.get('Retry-After')
                     else:
                         print(f"HTTP {response.status} for {url}")
-                        return False
-                        
+                        return None
+            
+            except retry_errors as e:
+                # Connection drops, truncated bodies and timeouts are retried like rate limiting
+                if attempt + 1 == max_attempts:
+                    print(f"Error downloading {url}: {e}")
+                    return None
             except Exception as e:
                 print(f"Error downloading {url}: {e}")
-                # Clean up temp file
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
-                return False
+                return None
+            
+            delay = retry_delay(retry_after, attempt)
+            if total_delay + delay > max_total_retry_delay:
+                print(f"Giving up on {url} after {attempt + 1} attempts")
+                return None
+            total_delay += delay
+            await asyncio.sleep(delay)
     
-    async def download_batch(self, session: aiohttp.ClientSession, batch: List[Tuple[str, str]]):
+    async def download_single(self, request_method: Callable, url: str, output_path: str) -> bool:
+        """Download a single file with retry logic"""
+        # Only requests hold a concurrency slot; the file is written without one
+        content = await self.fetch(request_method, url)
+        
+        if content is None:
+            return False
+        
+        temp_path = f"{output_path}.tmp"
+        try:
+            # Write to temp file first, then move, off the event loop
+            await asyncio.to_thread(self._write_file, temp_path, output_path, content)
+            self.downloaded += 1
+            return True
+        except Exception as e:
+            print(f"Error downloading {url}: {e}")
+            # Clean up temp file
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
+    
+    async def download_batch(self, request_method: Callable, batch: List[Tuple[str, str]]):
         """Download a batch of files concurrently"""
         tasks = []
         for url, output_path in batch:
-            task = asyncio.create_task(self.download_single(session, url, output_path))
+            task = asyncio.create_task(self.download_single(request_method, url, output_path))
             tasks.append(task)
         
         results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -237,35 +383,49 @@ class ParallelDownloader:
         
         print(f"Processing {len(urls_and_paths)} downloads...")
         
-        # Create session with reasonable timeout and SSL context
+        # Create each output directory once up front rather than per download
+        for output_dir in {os.path.dirname(output_path) for _, output_path in urls_and_paths}:
+            if output_dir:  # Only create if there's actually a directory part
+                try:
+                    os.makedirs(output_dir, exist_ok=True)
+                except OSError as e:
+                    # Downloads into this directory will fail and be counted individually
+                    print(f"Warning: Could not create {output_dir}: {e}")
+        
+        # Create session with reasonable timeout and the shared SSL context
         timeout = aiohttp.ClientTimeout(total=30, connect=10)
-        # Create SSL context that doesn't verify certificates (like curl without --cacert)
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        connector = aiohttp.TCPConnector(limit=50, limit_per_host=20, ssl=ssl_context)
+        # The semaphore bounds concurrency; never let the connection pool cap it lower.
+        # Cache DNS and keep idle connections open across the pauses between batches,
+        # so later batches reuse established TLS connections to the same host.
+        connector = aiohttp.TCPConnector(limit=max(self.max_concurrent, 50), limit_per_host=max(self.max_concurrent, 20), ssl=ssl_context,
+                                         ttl_dns_cache=300, keepalive_timeout=max(60, self.max_delay + 30))
         
         async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
-            # Process in random batches
-            remaining = urls_and_paths.copy()
+            # Use appropriate HTTP method
+            request_method = session.post if self.http_method == 'POST' else session.get
+            
+            # Process in random batches: shuffle once, then take consecutive slices
+            shuffled = urls_and_paths.copy()
+            random.shuffle(shuffled)
+            start = 0
             batch_num = 0
             
-            while remaining:
+            while start < len(shuffled):
                 batch_num += 1
+                remaining = len(shuffled) - start
                 # Ensure batch size is valid - min_batch_size cannot exceed remaining files
-                effective_min_batch = min(self.min_batch_size, len(remaining))
-                effective_max_batch = min(self.max_batch_size, len(remaining))
+                effective_min_batch = min(self.min_batch_size, remaining)
+                effective_max_batch = min(self.max_batch_size, remaining)
                 batch_size = random.randint(effective_min_batch, effective_max_batch)
                 
-                # Take random sample for this batch
-                batch = random.sample(remaining, batch_size)
-                for item in batch:
-                    remaining.remove(item)
+                batch = shuffled[start:start + batch_size]
+                start += batch_size
+                remaining -= batch_size
                 
-                print(f"Batch {batch_num}: Processing {len(batch)} files ({len(remaining)} remaining)")
+                print(f"Batch {batch_num}: Processing {len(batch)} files ({remaining} remaining)")
                 
                 start_time = time.time()
-                await self.download_batch(session, batch)
+                await self.download_batch(request_method, batch)
                 batch_time = time.time() - start_time
                 
                 print(f"  Batch completed in {batch_time:.1f}s")
@@ -287,6 +447,8 @@ def main():
     parser.add_argument('--content-type', type=str, default='json', choices=['json', 'kml'], help='Content type for validation (default: json)')
     parser.add_argument('--http-method', type=str, default='POST', choices=['GET', 'POST'], help='HTTP method to use (default: POST)')
     parser.add_argument('--timestamp-file', type=str, help='JSON file containing timestamp data for comparison')
+    parser.add_argument('--skip-content-validation', action='store_true', help='Treat existing non-empty files as valid without reading them')
+    parser.add_argument('--skip-download-validation', action='store_true', help='Save any non-empty response without validating its content')
     
     args = parser.parse_args()
     
@@ -298,7 +460,9 @@ def main():
         max_concurrent=args.max_concurrent,
         content_type=args.content_type,
         http_method=args.http_method,
-        timestamp_file=args.timestamp_file
+        timestamp_file=args.timestamp_file,
+        skip_content_validation=args.skip_content_validation,
+        skip_download_validation=args.skip_download_validation
     )
     
     # Parse URLs
@@ -319,7 +483,9 @@ def main():
     
     if urls_to_download:
         # Run the downloads
-        asyncio.run(downloader.process_downloads(urls_to_download))
+        # uvloop.run only exists in uvloop >= 0.18; older releases use the default loop
+        run = getattr(uvloop, 'run', None) or asyncio.run
+        run(downloader.process_downloads(urls_to_download))
     
     # Print final stats
     print("\nDownload Summary:")